@@ -1,9 +1,13 @@
+# pandas・xlsxwriter・PIL は使う操作のときだけ読み込む（起動直後の最初の表示を速くする）
 import streamlit as st
-import pandas as pd
-import io
-import os
-import xlsxwriter
-from PIL import Image
+from pricing import unit_spec, gang_spec
+from export import ESTIMATE_COLUMNS, EXPORT_FORMATS, build_export
+from estimate_store import EstimateStore
+from takeoff_import import TAKEOFF_COLUMNS, template_csv, read_takeoff, price_takeoff
+from pickup_core import PICKUP_ITEMS, PICKUP_TO_ITEM, counts_to_takeoff, unpriced_pickups
+from gang_catalog import catalog_lines, config_detail, spec_configs
+from resources import load_estimate_db, load_master, load_thumbnail, warn_master_error
+import perf
 
 # ==========================================
 # 0. デザイン設定
@@ -30,138 +34,100 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# ==========================================
-# 1. データベース定義
-# ==========================================
-
-# シリーズ定義
-SERIES_NAMES = {
-    "fullcolor": "Panasonic フルカラー(モダン)",
-    "cosmo": "Panasonic コスモワイド21",
-    "advance": "Panasonic アドバンス",
-    "adv_metal": "Panasonic アドバンス(新金属)",
-    "select": "Panasonic セレクトプレート",
-    "sostyle": "Panasonic SO-STYLE",
-    "classic": "Panasonic クラシック",
-    "extra": "Panasonic エクストラ",
-    "jimbo": "JIMBO NKシリーズ"
-}
-
-# ▼ ハンドル単価マスタ
-HANDLE_PRICES_SINGLE = {
-    ("cosmo", "std"):   {(False, False): 115, (False, True): 185, (True, False): 185, (True, True): 255},
-    ("advance", "std"): {(False, False): 230, (False, True): 300, (True, False): 300, (True, True): 370},
-    ("advance", "black"):{(False, False): 330, (False, True): 400, (True, False): 400, (True, True): 440},
-    ("fullcolor", "std"):{(False, False): 0, (False, True): 20, (True, False): 50, (True, True): 70},
-    ("sostyle", "std"):  {(False, False): 450, (False, True): 450, (True, False): 450, (True, True): 450},
-    ("sostyle", "black"):{(False, False): 450, (False, True): 450, (True, False): 450, (True, True): 450},
-    ("other", "std"):    {(False, False): 0, (False, True): 0, (True, False): 0, (True, True): 0},
-}
-
-# ▼ プレート単価マスタ (1連)
-PLATE_PRICES_1 = {
-    ("cosmo", "std"): 170,     ("advance", "std"): 330,   ("advance", "black"): 430,
-    ("sostyle", "std"): 900,   ("sostyle", "black"): 900, ("fullcolor", "std"): 220,
-    ("jimbo", "std"): 600,
-}
-
-# ▼ 部材マスタ
-ITEMS_DB = {
-    "sw_b_mech": {"name": "片切スイッチ", "icon": "🔘", "img_file": "sw_b.jpg", "has_lamp": False,
-                  "fullcolor": 250, "cosmo": 250, "advance": 250, "sostyle": 900, "jimbo": 1800},
-    "sw_h_mech": {"name": "ほたるスイッチ", "icon": "🟢", "img_file": "sw_b.jpg", "has_lamp": True,
-                  "fullcolor": 630, "cosmo": 550, "advance": 550, "sostyle": 1970, "jimbo": 2900},
-    "sw_3_mech": {"name": "3路スイッチ", "icon": "🔄", "img_file": "sw_3.jpg", "has_lamp": False,
-                  "fullcolor": 430, "cosmo": 420, "advance": 420, "sostyle": 1500, "jimbo": 2200},
-    "sw_3h_mech": {"name": "3路ほたるSW", "icon": "🔄🟢", "img_file": "sw_3.jpg", "has_lamp": True,
-                   "fullcolor": 850, "cosmo": 760, "advance": 700, "sostyle": 2900, "jimbo": 3300},
-    "sw_4_mech": {"name": "4路スイッチ", "icon": "🔀", "img_file": "sw_4.jpg", "has_lamp": False,
-                  "fullcolor": 1600, "cosmo": 1600, "advance": 1600, "sostyle": 3500, "jimbo": 3200},
-    "sw_4h_mech": {"name": "4路ほたるSW", "icon": "🔀🟢", "img_file": "sw_4.jpg", "has_lamp": True,
-                   "fullcolor": 2100, "cosmo": 1800, "advance": 1600, "sostyle": 5300, "jimbo": 4200},
-    "outlet_w": {"name": "ダブルコンセント", "icon": "🔌", "img_file": "outlet_w.jpg", "has_lamp": False,
-                 "fullcolor": 380, "cosmo": 550, "advance": 800, "sostyle": 1200, "jimbo": 1300},
-    "outlet_e": {"name": "アース付コンセント", "icon": "⏚", "img_file": "outlet_e.jpg", "has_lamp": False,
-                 "fullcolor": 450, "cosmo": 600, "advance": 900, "sostyle": 1300, "jimbo": 1500},
-    "tv_4k": {"name": "TV端子(4K8K)", "icon": "📺", "img_file": "tv_4k.jpg", "has_lamp": False,
-              "fullcolor": 1400, "cosmo": 1400, "advance": 1700, "sostyle": 2100, "jimbo": 2300},
-    "lan_6": {"name": "LAN(CAT6)", "icon": "💻", "img_file": "lan_6.jpg", "has_lamp": False,
-              "fullcolor": 2090, "cosmo": 2090, "advance": 2500, "sostyle": 3500, "jimbo": 3200},
-}
-
-FRAME_PRICES = {"fullcolor": 60, "cosmo": 70, "advance": 70, "sostyle": 150, "jimbo": 100}
+# DENZAI_PROFILE=1 または ?profile=1 のときだけ区間ごとの時間を計る（perf.py）
+perf.start_run("見積")
+perf.mark("初期化・マスタ読込")
 
 # ==========================================
 # 2. 関数ロジック
 # ==========================================
-if 'estimate_list' not in st.session_state:
-    st.session_state.estimate_list = []
+# 見積は SQLite (data/estimates.db) に自動保存し、URL の ?job= で再読込後も復元する
+estimate_db = load_estimate_db()
+
+def open_job(job_id):
+    job, store = estimate_db.load(job_id)
+    if job is None: return
+    st.session_state.estimate = store
+    st.session_state.job_id = job_id
+    st.session_state.client_name = job["client_name"]
+    st.session_state.hm_name = job["hm_name"]
+    st.session_state.series_pref = (job["src"], job["tgt"], job["color"])
+    # 読み込んだ内容は保存済みなので、開いただけで自動保存 (全行の書き直しと更新日時の更新) をしない
+    st.session_state.saved_state = (store.revision, job["client_name"], job["hm_name"], job["src"], job["tgt"], job["color"])
+    st.query_params["job"] = str(job_id)
+
+def duplicate_job(job_id):
+    new_id = estimate_db.duplicate(job_id)  # 他のセッションで削除済みなら None
+    if new_id is not None: open_job(new_id)
+
+def new_job():
+    st.session_state.estimate = EstimateStore()
+    st.session_state.job_id = None
+    st.session_state.client_name = ""
+    st.session_state.hm_name = ""
+    st.session_state.saved_state = None
+    st.session_state.pop("export_cache", None)
+    st.query_params.clear()
+
+if 'estimate' not in st.session_state:
+    st.session_state.estimate = EstimateStore()
+    if st.query_params.get("job", "").isdigit(): open_job(int(st.query_params["job"]))
+estimate = st.session_state.estimate
+
+# 価格マスタと全組み合わせ差額表はプロセスで1つだけ持ち、全ページ・全セッションで共有する（resources.py）
+price_master, price_tables, diff_table = load_master()
+SERIES_NAMES = price_tables.series_names
+ITEMS_DB = price_tables.items
 
+# 部材画像は部材ごとに最初の表示で1回だけ縮小・圧縮し、全セッションで共有する（再実行ごとのディスク読込なし）
 def show_item_image(item_key):
     if item_key in ITEMS_DB:
-        item_data = ITEMS_DB[item_key]
-        img_filename = item_data.get("img_file", "")
-        img_path = os.path.join("img", img_filename)
-        if os.path.exists(img_path):
-            st.image(Image.open(img_path), use_column_width=True)
+        kind, data = load_thumbnail(price_tables.fingerprint, item_key, ITEMS_DB[item_key])
+        if kind == "image":
+            with perf.section("商品画像"):
+                st.image(data, use_column_width=True)
+            perf.payload("商品画像", len(data))
         else:
-            st.markdown(f"<h1 style='text-align: center; color: #ccc;'>{item_data['icon']}</h1>", unsafe_allow_html=True)
-
-def get_db_price(db, series_key, color_type, *args):
-    if (series_key, color_type) in db: val = db[(series_key, color_type)]
-    elif (series_key, "std") in db: val = db[(series_key, "std")]
-    else: return db.get(series_key, 0)
-    if args and isinstance(val, dict): return val.get(args[0], 0)
-    return val
-
-def calculate_single_unit(item_key, src_series, tgt_series, tgt_color, needs_window, needs_name, handle_type="single"):
-    item = ITEMS_DB[item_key]
-    p_body_src = item.get(src_series, 0)
-    p_body_tgt = item.get(tgt_series, 0)
-    p_frame_src = FRAME_PRICES.get(src_series, 0)
-    p_frame_tgt = FRAME_PRICES.get(tgt_series, 0)
-    p_plate_src = get_db_price(PLATE_PRICES_1, src_series, "std")
-    p_plate_tgt = get_db_price(PLATE_PRICES_1, tgt_series, tgt_color)
-    
-    if "outlet" in item_key or "tv" in item_key or "lan" in item_key:
-        p_handle_src = 0; p_handle_tgt = 0
-    else:
-        h_key = (needs_window, needs_name)
-        p_h_src = get_db_price(HANDLE_PRICES_SINGLE, src_series, "std", h_key)
-        p_h_tgt = get_db_price(HANDLE_PRICES_SINGLE, tgt_series, tgt_color, h_key)
-        if handle_type == "double":
-            adder_src = 110 if src_series == "cosmo" else 320
-            adder_tgt = 110 if tgt_series == "cosmo" else 320
-            p_h_src += adder_src; p_h_tgt += adder_tgt
-        elif handle_type == "triple":
-            adder_src = 220 if src_series == "cosmo" else 640
-            adder_tgt = 220 if tgt_series == "cosmo" else 640
-            p_h_src += adder_src; p_h_tgt += adder_tgt
-        p_handle_src = p_h_src; p_handle_tgt = p_h_tgt
-
-    total_src = p_body_src + p_frame_src + p_plate_src + p_handle_src
-    total_tgt = p_body_tgt + p_frame_tgt + p_plate_tgt + p_handle_tgt
-    return total_tgt - total_src
+            st.markdown(data, unsafe_allow_html=True)
 
 # ==========================================
 # 3. UI - サイドバー
 # ==========================================
+perf.mark("サイドバー")
 st.sidebar.header("🏠 物件情報")
-client_name = st.sidebar.text_input("施主名")
-hm_name = st.sidebar.text_input("HM名")
+client_name = st.sidebar.text_input("施主名", key="client_name")
+hm_name = st.sidebar.text_input("HM名", key="hm_name")
+with st.sidebar.expander("📂 保存済み見積"):
+    job_query = st.text_input("施主名・HM名で検索", key="job_query")
+    jobs = {j["id"]: j for j in estimate_db.search(job_query)}
+    if jobs:
+        job_sel = st.selectbox("見積を選択", list(jobs), key="job_sel",
+                               format_func=lambda i: f"#{i} {jobs[i]['client_name'] or '(施主名なし)'} / {jobs[i]['hm_name']} ¥{jobs[i]['grand_total']:,}")
+        c_open, c_dup = st.columns(2)
+        with c_open: st.button("開く", key="btn_job_open", on_click=open_job, args=(job_sel,))
+        with c_dup: st.button("複製", key="btn_job_dup", on_click=duplicate_job, args=(job_sel,))
+    else:
+        st.caption("保存済みの見積はありません")
+    st.button("🆕 新規見積", key="btn_job_new", on_click=new_job)
 st.sidebar.markdown("---")
 st.sidebar.subheader("⚙️ 設定")
-source_series_key = st.sidebar.selectbox("【現在】変更元", list(SERIES_NAMES.keys()), index=1, format_func=lambda x: SERIES_NAMES[x])
-target_series_key = st.sidebar.selectbox("【変更】変更先", list(SERIES_NAMES.keys()), index=2, format_func=lambda x: SERIES_NAMES[x])
+st.sidebar.caption(f"価格マスタ: {price_master.version}")
+# 選択は series_pref に控え、拾い出しページから戻ってきたときも同じ設定で開く
+series_keys = list(SERIES_NAMES.keys())
+pref_src, pref_tgt, pref_color = st.session_state.get("series_pref", (series_keys[1], series_keys[2], "std"))
+source_series_key = st.sidebar.selectbox("【現在】変更元", series_keys, index=series_keys.index(pref_src) if pref_src in series_keys else 1, format_func=lambda x: SERIES_NAMES[x])
+target_series_key = st.sidebar.selectbox("【変更】変更先", series_keys, index=series_keys.index(pref_tgt) if pref_tgt in series_keys else 2, format_func=lambda x: SERIES_NAMES[x])
 target_color_mode = "std"
 if target_series_key in ["advance", "sostyle"]:
-    color_opt = st.sidebar.radio(f"{SERIES_NAMES[target_series_key]}の色", ["標準色 (白・グレー等)", "マットブラック (黒)"], index=0)
+    color_opt = st.sidebar.radio(f"{SERIES_NAMES[target_series_key]}の色", ["標準色 (白・グレー等)", "マットブラック (黒)"], index=1 if pref_color == "black" else 0)
     if "ブラック" in color_opt: target_color_mode = "black"
+st.session_state.series_pref = (source_series_key, target_series_key, target_color_mode)
 
 # ==========================================
 # 4. メイン画面
 # ==========================================
 st.title("⚡ 電材差額見積りアプリ Pro")
+warn_master_error(price_master)
 st.info(f"計算モード： {SERIES_NAMES[source_series_key]} ➡ {SERIES_NAMES[target_series_key]} ({'黒' if target_color_mode=='black' else '標準色'})")
 
 tab1, tab2, tab3 = st.tabs(["📝 基本(1連)クイック", "🏗️ 多連・詳細ビルダー", "📄 見積書発行"])
@@ -170,6 +136,38 @@ tab1, tab2, tab3 = st.tabs(["📝 基本(1連)クイック", "🏗️ 多連・
 # TAB 1: 簡易入力（リセット機能追加）
 # ------------------------------------------
 with tab1:
+    perf.mark("TAB1 簡易入力")
+    # 図面拾い出しページから届いた個数（再入力なしでそのまま見積へ）
+    handoff = st.session_state.get("pickup_handoff")
+    if handoff:
+        # 価格マスタを編集して拾い出しの部材が無くなっていても、破棄ボタンは出して結果を捨てられるようにする
+        pickup_lines = None
+        missing = unpriced_pickups(handoff["counts"], ITEMS_DB)
+        if missing:
+            st.error(f"📐 図面拾い出しの結果（{handoff['source']}）を見積に追加できません。現在の価格マスタに次の部材がありません: "
+                     + " / ".join(f"{PICKUP_ITEMS[k]['name']} ({PICKUP_TO_ITEM[k]})" for k in missing))
+        else:
+            try:
+                pickup_lines = price_takeoff(counts_to_takeoff(handoff["counts"], f"図面:{handoff['source']}"), diff_table,
+                                             source_series_key, target_series_key, target_color_mode)
+            except ValueError as e:
+                st.error(f"📐 図面拾い出しの結果（{handoff['source']}）を計算できませんでした: "
+                         + " / ".join(line.split(": ", 1)[-1] for line in str(e).splitlines()[1:]))
+        if pickup_lines is not None:
+            st.info(f"📐 図面拾い出しの結果が届いています（{handoff['source']} / 差額合計 ¥{pickup_lines['total_diff'].sum():,.0f}）")
+            st.dataframe(pickup_lines[ESTIMATE_COLUMNS], use_container_width=True, hide_index=True)
+
+        def add_pickup(lines):
+            estimate.extend(lines)
+            st.session_state.pop("pickup_handoff", None)
+            st.session_state.flash = "図面拾い出しの結果を追加しました！"
+
+        c_add, c_drop = st.columns(2)
+        with c_add: st.button("見積に追加", key="btn_pickup_add", on_click=add_pickup, args=(pickup_lines,), disabled=pickup_lines is None)
+        with c_drop: st.button("破棄", key="btn_pickup_drop", on_click=lambda: st.session_state.pop("pickup_handoff", None))
+        st.markdown("---")
+    if st.session_state.get("flash"): st.success(st.session_state.pop("flash"))
+
     st.markdown("### 基本スイッチ・コンセント入力")
     is_name_req_simple = st.checkbox("📛 すべて「ネーム付」にする（+差額）", value=False)
     
@@ -198,14 +196,13 @@ with tab1:
                 if qty > 0:
                     item = ITEMS_DB[item_key]
                     needs_window = item.get("has_lamp", False)
-                    diff = calculate_single_unit(item_key, source_series_key, target_series_key, target_color_mode, needs_window, is_name_req_simple)
+                    diff = diff_table.single(item_key, source_series_key, target_series_key, target_color_mode, needs_window, is_name_req_simple)
                     detail_txt = "標準セット"
                     if needs_window: detail_txt += "(表示付)"
                     if is_name_req_simple: detail_txt += "(ネーム付)"
-                    st.session_state.estimate_list.append({
-                        "type": "1連(基本)", "name": item['name'], "detail": detail_txt,
-                        "unit_diff": diff, "qty": qty, "total_diff": diff * qty
-                    })
+                    estimate.append("1連(基本)", item['name'], detail_txt, diff, qty,
+                                    source_series_key, target_series_key, target_color_mode,
+                                    unit_spec(item_key, needs_window, is_name_req_simple))
             add_simple("sw_b_mech", qty_sw_b); add_simple("sw_h_mech", qty_sw_h)
             add_simple("sw_3_mech", qty_sw_3); add_simple("sw_3h_mech", qty_sw_3h)
             add_simple("sw_4_mech", qty_sw_4); add_simple("outlet_w", qty_out_w) 
@@ -215,10 +212,30 @@ with tab1:
         # 入力値クリアボタン
         st.button("🗑️ 入力値を「0」にリセット", on_click=clear_inputs)
 
+    st.markdown("---")
+    with st.expander("📥 拾い表の一括取込 (CSV / Excel)"):
+        st.caption("列: " + ", ".join(TAKEOFF_COLUMNS) + "　※ src/tgt/color が空の行はサイドバーの設定で計算します")
+        st.download_button("ひな形をダウンロード", template_csv(),
+                           "拾い表_ひな形.csv", "text/csv")
+        takeoff_file = st.file_uploader("拾い表ファイル", type=["csv", "xlsx", "xlsm"], key="takeoff_file")
+        if takeoff_file:
+            try:
+                takeoff = price_takeoff(read_takeoff(takeoff_file, takeoff_file.name), diff_table,
+                                        source_series_key, target_series_key, target_color_mode)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.dataframe(takeoff[ESTIMATE_COLUMNS], use_container_width=True, hide_index=True)
+                st.metric("取込分の差額合計", f"¥ {takeoff['total_diff'].sum():,.0f}")
+                if st.button(f"{len(takeoff)} 行を見積に一括追加", key="btn_takeoff"):
+                    estimate.extend(takeoff)
+                    st.success("追加しました！")
+
 # ------------------------------------------
 # TAB 2: 詳細ビルダー
 # ------------------------------------------
 with tab2:
+    perf.mark("TAB2 詳細ビルダー")
     st.markdown("### 詳細ビルダー：画像確認モード")
     plate_size = st.radio("プレートサイズ", ["1連", "2連", "3連"], horizontal=True)
     cols_num = {"1連":1, "2連":2, "3連":3}[plate_size]
@@ -254,68 +271,107 @@ with tab2:
     qty_build = st.number_input("この構成のセット数", min_value=1, value=1)
     
     if st.button("見積に追加", key="add_build"):
-        p_unit_src = get_db_price(PLATE_PRICES_1, source_series_key, "std")
-        p_unit_tgt = get_db_price(PLATE_PRICES_1, target_series_key, target_color_mode)
-        plate_factor = 1.0 if cols_num == 1 else (1.8 if cols_num == 2 else 2.6)
-        if target_series_key == "cosmo": plate_factor = cols_num * 1.5
-        diff_plate = (p_unit_tgt - p_unit_src) * plate_factor
-        total_unit_diff = diff_plate
-        details_str = []
-        for idx, config in enumerate(column_configs):
-            d_body = sum([ITEMS_DB[itm].get(target_series_key,0) - ITEMS_DB[itm].get(source_series_key,0) for itm in config['items']])
-            if "outlet" in str(column_configs[0]['items'][0]) or "コンセント" in str(config['handle']): d_handle = 0
-            else:
-                needs_window = any(ITEMS_DB[itm].get("has_lamp", False) for itm in config['items'])
-                h_key = (needs_window, config['is_name'])
-                p_h_src = get_db_price(HANDLE_PRICES_SINGLE, source_series_key, "std", h_key)
-                p_h_tgt = get_db_price(HANDLE_PRICES_SINGLE, target_series_key, target_color_mode, h_key)
-                d_handle = p_h_tgt - p_h_src
-            d_frame = FRAME_PRICES.get(target_series_key,0) - FRAME_PRICES.get(source_series_key,0)
-            total_unit_diff += (d_body + d_handle + d_frame)
-            item_names = [ITEMS_DB[itm]['name'] for itm in config['items']]
-            details_str.append(f"[{config['handle']}]{','.join(item_names)}")
-
-        st.session_state.estimate_list.append({
-            "type": f"{plate_size}カスタム", "name": "詳細構成セット", "detail": " / ".join(details_str),
-            "unit_diff": total_unit_diff, "qty": qty_build, "total_diff": total_unit_diff * qty_build
-        })
+        build_spec = gang_spec(column_configs)
+        total_unit_diff = diff_table.spec_diff(build_spec, source_series_key, target_series_key, target_color_mode)
+        estimate.append(f"{plate_size}カスタム", "詳細構成セット", config_detail(column_configs, ITEMS_DB), total_unit_diff, qty_build,
+                        source_series_key, target_series_key, target_color_mode, build_spec)
         st.success("追加しました！")
 
+    # よく使う構成は名前を付けて保存し、数量を入れた分をまとめて追加する（単価差額は構成・シリーズごとにメモ化）
+    with st.expander("📚 構成カタログ（保存した構成をまとめて追加）"):
+        c_nm, c_sv = st.columns([3, 1])
+        with c_nm: config_name = st.text_input("この構成に名前を付けて保存", placeholder="例) 2連: 片切+ほたる / コンセント", key="config_name")
+        with c_sv:
+            st.write("")
+            if st.button("💾 保存", key="btn_save_config", disabled=not config_name.strip()):
+                estimate_db.save_config(config_name.strip(), gang_spec(column_configs))
+                st.success(f"「{config_name.strip()}」を保存しました")
+
+        # マスタから消えた部材を含む構成は出さない
+        catalog = [c for c in estimate_db.configs() if all(i in ITEMS_DB for col in spec_configs(c["spec"]) for i in col["items"])]
+        if catalog:
+            import pandas as pd
+            editor_key = f"catalog_editor_{st.session_state.get('catalog_rev', 0)}"
+            st.data_editor(pd.DataFrame({
+                "名前": [c["name"] for c in catalog],
+                "構成": [config_detail(spec_configs(c["spec"]), ITEMS_DB) for c in catalog],
+                "単価差額": [diff_table.spec_diff(c["spec"], source_series_key, target_series_key, target_color_mode) for c in catalog],
+                "数量": 0,
+            }), disabled=["名前", "構成", "単価差額"], hide_index=True, use_container_width=True, key=editor_key,
+                column_config={"数量": st.column_config.NumberColumn(min_value=0, step=1)})
+
+            def add_catalog(catalog, editor_key):
+                edits = st.session_state.get(editor_key, {}).get("edited_rows", {})
+                entries = [(catalog[int(i)]["spec"], int(r["数量"])) for i, r in edits.items() if int(r.get("数量") or 0) > 0]
+                if not entries: return
+                estimate.extend(catalog_lines(entries, diff_table, source_series_key, target_series_key, target_color_mode))
+                st.session_state.catalog_rev = st.session_state.get("catalog_rev", 0) + 1  # 数量欄を 0 に戻す
+                st.session_state.catalog_flash = f"{len(entries)} 構成・{sum(q for _, q in entries)} セットを追加しました！"
+
+            c_add, c_del, c_btn = st.columns([2, 2, 1])
+            with c_add: st.button("➕ 数量を入れた構成をまとめて追加", key="btn_add_catalog", on_click=add_catalog, args=(catalog, editor_key))
+            with c_del: st.selectbox("削除する構成", [c["name"] for c in catalog], key="config_del", label_visibility="collapsed")
+            with c_btn: st.button("🗑️ 削除", key="btn_del_config", on_click=lambda: estimate_db.delete_config(st.session_state.config_del))
+            if st.session_state.get("catalog_flash"): st.success(st.session_state.pop("catalog_flash"))
+        else:
+            st.caption("保存した構成はまだありません。上で組んだ構成に名前を付けて保存してください。")
+
 # ------------------------------------------
 # TAB 3: 見積書発行
 # ------------------------------------------
 with tab3:
+    perf.mark("TAB3 見積書発行")
     st.markdown("### 見積りプレビュー")
-    if st.session_state.estimate_list:
-        df = pd.DataFrame(st.session_state.estimate_list)
-        st.dataframe(df[["type", "name", "detail", "unit_diff", "qty", "total_diff"]], use_container_width=True)
-        grand_total = df["total_diff"].sum()
+    if estimate:
+        df = estimate.frame()
+        st.dataframe(df[ESTIMATE_COLUMNS], use_container_width=True)
+        perf.payload("見積表", lambda: df[ESTIMATE_COLUMNS].memory_usage(deep=True).sum())
+        grand_total = estimate.grand_total
         st.metric("総計(税抜)", f"¥ {grand_total:,.0f}")
+        st.caption(" / ".join(f"{k}: ¥{v:,.0f}" for k, v in estimate.subtotals.items()))
+
+        # 展開していなくても中身は毎回実行されるので、見積内容とマスタが同じ間は前回の結果を使う
+        with st.expander("🔍 全シリーズ比較（この見積を各変更先で計算）"):
+            compare_key = (estimate.digest(), diff_table.fingerprint)
+            cached = st.session_state.get("compare_cache")
+            if cached is None or cached[0] != compare_key:
+                with perf.section("全シリーズ比較"):
+                    st.session_state.compare_cache = cached = (compare_key, diff_table.compare_targets(df))
+            compare = cached[1]
+            st.dataframe([{"変更先": SERIES_NAMES[k], "差額合計": v} for k, v in compare.items()],
+                         hide_index=True, use_container_width=True)
         
-        def to_excel(df, client, hm, src, tgt, total):
-            output = io.BytesIO()
-            wb = xlsxwriter.Workbook(output, {'in_memory': True})
-            ws = wb.add_worksheet("差額見積")
-            fmt_head = wb.add_format({'bold': True, 'bg_color': '#cceeff', 'border': 1})
-            ws.write(0, 0, f"施主: {client}")
-            ws.write(1, 0, f"HM: {hm}")
-            ws.write(2, 0, f"{src} ➡ {tgt}")
-            headers = ["種類", "品名", "詳細", "単価差額", "数量", "差額合計"]
-            for c, h in enumerate(headers): ws.write(4, c, h, fmt_head)
-            for r, row in enumerate(df.to_dict('records')):
-                ws.write(5+r, 0, row['type'])
-                ws.write(5+r, 1, row['name'])
-                ws.write(5+r, 2, row['detail'])
-                ws.write(5+r, 3, row['unit_diff'])
-                ws.write(5+r, 4, row['qty'])
-                ws.write(5+r, 5, row['total_diff'])
-            ws.write(5+len(df), 5, total, wb.add_format({'bold':True}))
-            wb.close()
-            return output.getvalue()
-
-        xl = to_excel(df, client_name, hm_name, SERIES_NAMES[source_series_key], SERIES_NAMES[target_series_key], grand_total)
-        st.download_button("Excelダウンロード", xl, "見積.xlsx")
-        
+        # 書き出しファイルは「作成」を押したときだけ作り、見積内容のハッシュが同じ間は使い回す
+        c_fmt, c_dl = st.columns([1, 2])
+        with c_fmt: export_fmt = st.radio("出力形式", list(EXPORT_FORMATS), horizontal=True, key="export_fmt")
+        src_label, tgt_label = SERIES_NAMES[source_series_key], SERIES_NAMES[target_series_key]
+        export_key = (export_fmt, estimate.digest(), client_name, hm_name, src_label, tgt_label)
+        with c_dl:
+            cached = st.session_state.get("export_cache")
+            if cached is None or cached[0] != export_key:
+                if st.button("📦 ダウンロード用ファイルを作成", key="btn_export"):
+                    with perf.section(f"書き出し作成 ({export_fmt})"):
+                        data = build_export(export_fmt, df, client_name, hm_name, src_label, tgt_label, grand_total)
+                    st.session_state.export_cache = cached = (export_key, data)
+            if cached is not None and cached[0] == export_key:
+                file_name, mime = EXPORT_FORMATS[export_fmt]
+                st.download_button(f"{export_fmt}ダウンロード", cached[1], file_name, mime)
+                perf.payload("ダウンロード", len(cached[1]))
+
         if st.button("見積リストを全消去", key="btn_reset"):
-            st.session_state.estimate_list = []
+            estimate.clear()
+            st.session_state.pop("export_cache", None)
             st.rerun()
+
+# ==========================================
+# 5. 自動保存
+# ==========================================
+perf.mark("自動保存")
+save_state = (estimate.revision, client_name, hm_name, source_series_key, target_series_key, target_color_mode)
+if (estimate or st.session_state.get("job_id")) and st.session_state.get("saved_state") != save_state:
+    st.session_state.job_id = estimate_db.save(estimate, client_name, hm_name, source_series_key, target_series_key,
+                                               target_color_mode, st.session_state.get("job_id"))
+    st.session_state.saved_state = save_state
+    st.query_params["job"] = str(st.session_state.job_id)
+
+perf.finish_run()
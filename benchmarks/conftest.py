@@ -0,0 +1,115 @@
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+# ==========================================
+# ベンチマークの計測と基準値 (baseline.json) との比較
+# ==========================================
+# python -m pytest benchmarks                  … 計測して結果を記録するだけ (時間では失敗しない)
+# python -m pytest benchmarks --bench-update   … 計測結果でこのマシンの baseline.json を作る／書き換える
+# python -m pytest benchmarks --bench-compare  … baseline.json と比べて、遅く・重くなった段階を失敗にする
+# python -m pytest benchmarks -m "not bench"   … 計測せず、ゴールデン値などの正しさの確認だけ
+# 時間はマシンと負荷で大きく変わるので、baseline.json はリポジトリに入れず、比べるマシンで作る。
+# 結果は毎回 benchmarks/results.json に書き出す。
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results.json")
+MIN_SLACK_SEC = 0.02  # 数十 ms 以下の段階は揺れが大きいので、差がこれ未満なら許容する
+MIN_SLACK_MB = 2.0
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench")
+    group.addoption("--bench-update", action="store_true", help="計測結果で baseline.json を書き換える")
+    group.addoption("--bench-compare", action="store_true", help="baseline.json と比べて遅くなった段階を失敗にする")
+    group.addoption("--bench-threshold", type=float, default=float(os.environ.get("BENCH_THRESHOLD", "2.0")),
+                    help="--bench-compare で基準値の何倍を超えたら失敗にするか (既定 2.0)")
+    group.addoption("--bench-rounds", type=int, default=5, help="各段階の計測回数 (中央値を採用)")
+
+def _load_baseline():
+    if not os.path.exists(BASELINE_PATH): return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+class Bench:
+    """bench(name, fn, items) で fn を計測し、処理量/秒とピークメモリを記録する。戻り値は fn の結果。"""
+
+    def __init__(self, config, baseline, results):
+        self.compare = config.getoption("--bench-compare") and not config.getoption("--bench-update")
+        self.threshold = config.getoption("--bench-threshold")
+        self.rounds = config.getoption("--bench-rounds")
+        self.baseline = baseline
+        self.results = results
+
+    def __call__(self, name, fn, items, unit="lines", rounds=None):
+        times = []
+        for _ in range(rounds or self.rounds):
+            gc.collect()
+            t0 = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - t0)
+        # ピークメモリは tracemalloc で別に1回測る（時間の計測には含めない）
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.record(name, statistics.median(times), peak / 2 ** 20, items, unit)
+        return result
+
+    def record(self, name, seconds, peak_mb, items, unit="lines"):
+        """外で測った値 (子プロセスの中で測った時間など) を記録し、基準値と比べる。"""
+        record = {"items": items, "unit": unit, "seconds": round(seconds, 6),
+                  "per_sec": round(items / seconds) if seconds else None, "peak_mb": round(peak_mb, 3)}
+        self.results[name] = record
+
+        base = self.baseline.get(name)
+        if base and self.compare:
+            limit = max(base["seconds"] * self.threshold, base["seconds"] + MIN_SLACK_SEC)
+            if seconds > limit:
+                pytest.fail(f"{name}: {seconds:.4f}s (基準 {base['seconds']:.4f}s の {self.threshold} 倍を超過)")
+            limit_mb = max(base["peak_mb"] * self.threshold, base["peak_mb"] + MIN_SLACK_MB)
+            if record["peak_mb"] > limit_mb:
+                pytest.fail(f"{name}: ピークメモリ {record['peak_mb']}MB (基準 {base['peak_mb']}MB の {self.threshold} 倍を超過)")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: 計測するテスト (bench フィクスチャを使うもの)")
+    config._bench_baseline = _load_baseline()
+    if config.getoption("--bench-compare") and not config._bench_baseline:
+        raise pytest.UsageError(f"{BASELINE_PATH} がありません。先に --bench-update で作ってください")
+    config._bench_results = {}
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if "bench" in getattr(item, "fixturenames", ()): item.add_marker(pytest.mark.bench)
+
+def pytest_sessionfinish(session):
+    results = getattr(session.config, "_bench_results", None)
+    if not results: return
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1, sort_keys=True)
+    if session.config.getoption("--bench-update"):
+        baseline = dict(session.config._bench_baseline, **results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, "_bench_results", None)
+    if not results: return
+    terminalreporter.section("benchmarks")
+    for name, r in sorted(results.items()):
+        base = config._bench_baseline.get(name)
+        ratio = f"x{r['seconds'] / base['seconds']:.2f}" if base and base["seconds"] else "-"
+        terminalreporter.write_line(f"{name:<40} {r['seconds']:>10.4f}s {r['per_sec'] or 0:>12,}/{r['unit'][:-1] if r['unit'].endswith('s') else r['unit']}/s"
+                                    f" {r['peak_mb']:>9.2f}MB  {ratio}")
+
+@pytest.fixture
+def bench(request):
+    return Bench(request.config, request.config._bench_baseline, request.config._bench_results)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from pricing import COLOR_TYPES, HANDLE_TYPES, ITEMS_DB, SERIES_NAMES
+from pickup_core import PICKUP_ITEMS
+from takeoff_import import TAKEOFF_COLUMNS
+
+# ==========================================
+# ベンチマーク用の合成データ（乱数の種を固定）
+# ==========================================
+ITEM_KEYS = list(ITEMS_DB)
+SERIES_KEYS = list(SERIES_NAMES)
+GANG_RATE = 0.2
+
+def random_configs(rng, n):
+    """多連ビルダーの column_configs を n 個。"""
+    configs = []
+    for _ in range(n):
+        cols = []
+        for _ in range(int(rng.integers(1, 4))):
+            h = int(rng.integers(len(HANDLE_TYPES)))
+            cols.append({"items": [ITEM_KEYS[i] for i in rng.integers(len(ITEM_KEYS), size=h + 1)],
+                         "handle": HANDLE_TYPES[h], "is_name": bool(rng.random() < 0.5)})
+        configs.append(cols)
+    return configs
+
+def batch_frame(n, seed=0):
+    """PriceTables.price_batch 形式の1連の行を n 行。"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "item": np.array(ITEM_KEYS, dtype=object)[rng.integers(len(ITEM_KEYS), size=n)],
+        "src": np.array(SERIES_KEYS, dtype=object)[rng.integers(len(SERIES_KEYS), size=n)],
+        "tgt": np.array(SERIES_KEYS, dtype=object)[rng.integers(len(SERIES_KEYS), size=n)],
+        "color": np.array(COLOR_TYPES, dtype=object)[rng.integers(len(COLOR_TYPES), size=n)],
+        "window": rng.random(n) < 0.3,
+        "name": rng.random(n) < 0.3,
+        "handle": np.array(HANDLE_TYPES, dtype=object)[rng.integers(len(HANDLE_TYPES), size=n)],
+        "qty": rng.integers(1, 20, size=n),
+    })
+
+def takeoff_frame(n, seed=0):
+    """拾い表 (takeoff_import 形式) を n 行。2割は多連の割り付け。"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    gangs = iter(random_configs(rng, n))
+    for i in range(n):
+        cfg = next(gangs)
+        if rng.random() < GANG_RATE:
+            layout = " / ".join(f"{c['handle']}:{'+'.join(c['items'])}" for c in cfg)
+            rows.append({"room": f"R{i % 50}", "item": "", "layout": layout, "name": "1" if cfg[0]["is_name"] else "0",
+                         "qty": str(int(rng.integers(1, 5)))})
+        else:
+            rows.append({"room": f"R{i % 50}", "item": ITEM_KEYS[int(rng.integers(len(ITEM_KEYS)))], "layout": "",
+                         "name": "0", "qty": str(int(rng.integers(1, 20)))})
+    return pd.DataFrame(rows, columns=TAKEOFF_COLUMNS).fillna("")
+
+def canvas_objects(n, width=1600, height=1100, seed=0):
+    """st_canvas の点モードが返す objects を n 個。"""
+    rng = np.random.default_rng(seed)
+    colors = [info["color"] for info in PICKUP_ITEMS.values()]
+    xs = rng.random(n) * width; ys = rng.random(n) * height; cs = rng.integers(len(colors), size=n)
+    return [{"type": "circle", "originX": "left", "originY": "center", "left": float(x) - 13, "top": float(y),
+             "radius": 3, "strokeWidth": 20, "fill": colors[c], "stroke": colors[c]} for x, y, c in zip(xs, ys, cs)]
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from estimate_store import EstimateStore
+from export import to_csv, to_excel
+from pricing import DiffTable, PriceTables
+from repricing import reprice
+from synthetic import takeoff_frame
+from takeoff_import import price_takeoff
+
+@pytest.fixture(scope="module")
+def diff_table():
+    return DiffTable(PriceTables.from_masters())
+
+@pytest.fixture(scope="module", params=[10_000, 100_000])
+def priced(request, diff_table):
+    return price_takeoff(takeoff_frame(request.param), diff_table, "cosmo", "advance")
+
+# ==========================================
+# 拾い表の一括計算 → 見積ストア → 書き出し
+# ==========================================
+def test_bench_price_takeoff(bench, diff_table, priced):
+    n = len(priced)
+    df = takeoff_frame(n)
+    result = bench(f"takeoff.price_takeoff[{n}]", lambda: price_takeoff(df, diff_table, "cosmo", "advance"), n)
+    assert result["total_diff"].sum() == priced["total_diff"].sum()
+
+def test_bench_store_append(bench, priced):
+    n = len(priced)
+    rows = priced.to_dict("records")
+
+    def run():
+        store = EstimateStore()
+        for r in rows:
+            store.append(r["type"], r["name"], r["detail"], r["unit_diff"], r["qty"], r["src"], r["tgt"], r["color"], r["spec"])
+        return store
+    store = bench(f"store.append[{n}]", run, n)
+    assert store.grand_total == priced["total_diff"].sum()
+
+def test_bench_store_extend_frame(bench, priced):
+    n = len(priced)
+
+    def run():
+        store = EstimateStore(); store.extend(priced)
+        return store.frame()
+    frame = bench(f"store.extend_frame[{n}]", run, n)
+    assert frame["total_diff"].sum() == priced["total_diff"].sum()
+
+def test_bench_to_excel(bench, priced):
+    n = len(priced)
+    total = int(priced["total_diff"].sum())
+    data = bench(f"export.to_excel[{n}]", lambda: to_excel(priced, "施主", "HM", "コスモ", "アドバンス", total), n, rounds=1)
+    assert data[:2] == b"PK"
+
+def test_bench_to_csv(bench, priced):
+    n = len(priced)
+    data = bench(f"export.to_csv[{n}]", lambda: to_csv(priced), n)
+    assert data.count(b"\n") == n + 1
+
+def test_bench_reprice(bench, diff_table, priced):
+    """保存済み見積 (20行/件) を別の変更先で一括再計算。"""
+    n = len(priced)
+    lines = priced[["spec", "src", "tgt", "color", "qty", "total_diff"]].assign(job_id=np.arange(n) // 20)
+    jobs = pd.DataFrame({"id": np.arange(n // 20), "client_name": "", "hm_name": "", "src": "cosmo", "tgt": "advance", "color": "std"})
+    report = bench(f"reprice.change_target[{n}]", lambda: reprice(jobs, lines, diff_table, tgt="sostyle"), n)
+    same = reprice(jobs, lines, diff_table)
+    assert (same["change"] == 0).all() and same["unpriced_lines"].sum() == 0
+    assert report["new_total"].sum() == price_takeoff(takeoff_frame(n), diff_table, "cosmo", "sostyle")["total_diff"].sum()
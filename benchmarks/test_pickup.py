@@ -0,0 +1,40 @@
+import pytest
+
+from pickup_core import PICKUP_ITEMS, MarkerTally, markers_to_drawing, objects_to_markers
+from synthetic import canvas_objects
+
+W, H = 1600, 1100
+
+# ==========================================
+# 拾い出しの集計（キャンバス JSON → 個数）
+# ==========================================
+@pytest.mark.parametrize("n", [10_000, 50_000])
+def test_bench_full_sync(bench, n):
+    objects = canvas_objects(n, W, H)
+
+    def run():
+        tally = MarkerTally(); tally.sync(objects, W, H)
+        return tally
+    tally = bench(f"pickup.full_sync[{n}]", run, n, unit="objects")
+    color_to_key = {info["color"]: k for k, info in PICKUP_ITEMS.items()}
+    expected = {k: 0 for k in PICKUP_ITEMS}
+    for o in objects: expected[color_to_key[o["fill"]]] += 1
+    assert tally.counts == expected
+
+@pytest.mark.parametrize("n", [10_000, 50_000])
+def test_bench_incremental_click(bench, n):
+    objects = canvas_objects(n + 1, W, H)
+    tally = MarkerTally(); tally.sync(objects[:n], W, H)
+
+    def run():
+        tally.sync(objects, W, H)      # 1点追加
+        tally.sync(objects[:n], W, H)  # 元に戻す
+    bench(f"pickup.incremental_click[{n}]", run, 2, unit="clicks")
+    assert tally.total == n
+
+@pytest.mark.parametrize("n", [10_000, 50_000])
+def test_bench_zoom_reproject(bench, n):
+    markers = objects_to_markers(canvas_objects(n, W, H), W, H)
+    drawing = bench(f"pickup.markers_to_drawing[{n}]", lambda: markers_to_drawing(markers, W * 2, H * 2), n, unit="objects")
+    back = objects_to_markers(drawing["objects"], W * 2, H * 2)
+    assert all(abs(a["x"] - b["x"]) < 1e-9 and abs(a["y"] - b["y"]) < 1e-9 for a, b in zip(markers, back))
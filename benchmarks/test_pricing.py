@@ -0,0 +1,110 @@
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pricing import (BATCH_COLUMNS, COLOR_TYPES, HANDLE_TYPES, ITEMS_DB, SERIES_NAMES, DiffTable, PriceTables,
+                     calculate_multi_gang, calculate_single_unit, gang_spec, parse_spec)
+from gang_catalog import catalog_lines, spec_configs
+from synthetic import SERIES_KEYS, batch_frame, random_configs, takeoff_frame
+from takeoff_import import price_takeoff
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden.json"), encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+@pytest.fixture(scope="module")
+def tables():
+    return PriceTables.from_masters()
+
+@pytest.fixture(scope="module")
+def diff_table(tables):
+    return DiffTable(tables)
+
+# ==========================================
+# 1. 円単位の一致（速い経路が元の計算と同じ金額になること）
+# ==========================================
+def test_golden_single_unit(tables, diff_table):
+    rows = GOLDEN["unit"]
+    for *args, expected in rows:
+        assert calculate_single_unit(*args) == expected, args
+        assert diff_table.single(*args) == expected, args
+    df = pd.DataFrame([r[:-1] for r in rows], columns=BATCH_COLUMNS[:-1]).assign(qty=3)
+    priced = tables.price_batch(df)
+    assert priced["unit_diff"].tolist() == [r[-1] for r in rows]
+    assert priced["total_diff"].tolist() == [r[-1] * 3 for r in rows]
+
+def test_golden_multi_gang(tables, diff_table):
+    for spec, src, tgt, color, expected in GOLDEN["gang"]:
+        cols = [{"items": list(items), "handle": h, "is_name": n} for items, h, n in parse_spec(spec)[1]]
+        assert calculate_multi_gang(cols, src, tgt, color) == expected, spec
+        assert tables.multi_gang(cols, src, tgt, color) == expected, spec
+        assert diff_table.multi_gang(cols, src, tgt, color) == expected, spec
+        assert diff_table.spec_diff(spec, src, tgt, color) == expected, spec
+
+def test_batch_matches_scalar_all_combinations(tables, diff_table):
+    rows = list(itertools.product(ITEMS_DB, SERIES_NAMES, SERIES_NAMES, COLOR_TYPES, (False, True), (False, True), HANDLE_TYPES))
+    expected = np.array([calculate_single_unit(*r) for r in rows])
+    priced = tables.price_batch(pd.DataFrame(rows, columns=BATCH_COLUMNS[:-1]).assign(qty=1))
+    assert (priced["unit_diff"].to_numpy() == expected).all()
+    assert [diff_table.single(*r) for r in rows] == expected.tolist()
+
+def test_compare_targets_matches_per_line(diff_table):
+    lines = price_takeoff(takeoff_frame(2000, seed=7), diff_table, "cosmo", "advance")
+    totals = diff_table.compare_targets(lines)
+    for tgt in SERIES_NAMES:
+        expected = sum(diff_table.spec_diff(s, src, tgt, c) * q for s, src, c, q in
+                       zip(lines["spec"], lines["src"], lines["color"], lines["qty"]))
+        assert totals[tgt] == expected, tgt
+
+# ==========================================
+# 2. 速度
+# ==========================================
+@pytest.mark.parametrize("n", [10_000, 100_000])
+def test_bench_scalar_pricing(bench, n):
+    rows = list(batch_frame(n)[BATCH_COLUMNS[:-1]].itertuples(index=False, name=None))
+    bench(f"pricing.scalar[{n}]", lambda: [calculate_single_unit(*r) for r in rows], n)
+
+@pytest.mark.parametrize("n", [10_000, 100_000])
+def test_bench_price_batch(bench, tables, n):
+    df = batch_frame(n)
+    bench(f"pricing.price_batch[{n}]", lambda: tables.price_batch(df), n)
+
+@pytest.mark.parametrize("n", [10_000, 100_000])
+def test_bench_diff_table_single(bench, diff_table, n):
+    rows = list(batch_frame(n)[BATCH_COLUMNS[:-1]].itertuples(index=False, name=None))
+    bench(f"pricing.diff_table_single[{n}]", lambda: [diff_table.single(*r) for r in rows], n)
+
+@pytest.mark.parametrize("n", [10_000])
+def test_bench_builder(bench, diff_table, n):
+    """Tab 2 の多連ビルダー 1 構成ずつの計算。"""
+    rng = np.random.default_rng(1)
+    configs = random_configs(rng, n)
+    series = [(SERIES_KEYS[i], SERIES_KEYS[j]) for i, j in rng.integers(len(SERIES_KEYS), size=(n, 2))]
+    bench(f"builder.calculate_multi_gang[{n}]",
+          lambda: [calculate_multi_gang(c, s, t, "std") for c, (s, t) in zip(configs, series)], n, unit="configs")
+    bench(f"builder.diff_table[{n}]",
+          lambda: [diff_table.multi_gang(c, s, t, "std") for c, (s, t) in zip(configs, series)], n, unit="configs")
+    specs = [gang_spec(c) for c in configs]
+
+    def run():
+        fresh = DiffTable(diff_table.tables)  # メモが空の表で測る
+        return [fresh.spec_diff(sp, s, t, "std") for sp, (s, t) in zip(specs, series)]
+    bench(f"builder.spec_diff[{n}]", run, n, unit="configs")
+
+@pytest.mark.parametrize("n", [10_000, 100_000])
+def test_bench_compare_targets(bench, diff_table, n):
+    lines = price_takeoff(takeoff_frame(n), diff_table, "cosmo", "advance")
+    bench(f"pricing.compare_targets[{n}]", lambda: diff_table.compare_targets(lines), n)
+
+@pytest.mark.parametrize("n", [10_000, 100_000])
+def test_bench_catalog_lines(bench, diff_table, n):
+    """構成カタログから数量付きでまとめて追加 (同じ構成の繰り返し)。"""
+    rng = np.random.default_rng(3)
+    specs = [gang_spec(c) for c in random_configs(rng, 30)]
+    entries = [(specs[i], int(q)) for i, q in zip(rng.integers(len(specs), size=n), rng.integers(1, 10, size=n))]
+    lines = bench(f"builder.catalog_lines[{n}]", lambda: catalog_lines(entries, diff_table, "cosmo", "advance", "std"), n)
+    expected = {s: calculate_multi_gang(spec_configs(s), "cosmo", "advance", "std") for s in specs}
+    assert lines["unit_diff"].tolist() == [expected[s] for s, _ in entries]
@@ -0,0 +1,76 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from conftest import HERE
+
+ROOT = os.path.dirname(HERE)
+
+# ==========================================
+# コールドスタート（新しいワーカーの最初の1リクエスト）
+# ==========================================
+# 同じプロセスではモジュールもキャッシュも温まっているので、毎回新しい Python プロセスで描画する。
+# 時間は子プロセスの中で測る (インタプリタと streamlit 本体の起動は含まない)。メモリは子プロセスの最大 RSS (Linux のみ)。
+#   import       … 1回目の描画中に import にかかった時間 (python -X importtime の集計)
+#   first_render … 起動直後の1回目の描画 (import・マスタ構築を含む)
+# DEFERRED は最初の描画では読み込まず、必要な操作をしたときに初めて import するモジュール。
+DEFERRED = {
+    "app.py": ("pandas", "xlsxwriter", "openpyxl", "PIL", "streamlit_drawable_canvas"),
+    "pages/1_図面拾い出し.py": ("pandas", "PIL", "pypdfium2", "streamlit_drawable_canvas"),
+    "pages/2_一括再計算.py": ("pandas", "openpyxl", "PIL"),
+}
+_MARK = "--- render ---"
+
+_CHILD = textwrap.dedent("""
+    import json, sys, time
+    from streamlit.testing.v1 import AppTest
+
+    def peak_mb():  # ru_maxrss は fork 元 (pytest) の値を引き継ぐので VmHWM を読む
+        try:
+            with open("/proc/self/status") as f:
+                return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+        except OSError:
+            return 0.0
+
+    at = AppTest.from_file(sys.argv[1], default_timeout=60)
+    print("%s", file=sys.stderr, flush=True)
+    t0 = time.perf_counter(); at.run(); t1 = time.perf_counter()
+    print("%s", file=sys.stderr, flush=True)
+    print(json.dumps({"first": t1 - t0, "rss_mb": peak_mb(),
+                      "errors": [str(e.value) for e in at.exception], "modules": sorted(sys.modules)}))
+""" % (_MARK, _MARK))
+
+def _import_seconds(stderr):
+    """描画中に始まった import のうち、いちばん外側のものの累計時間 (-X importtime は入れ子を字下げで表す)。"""
+    inside, total = False, 0
+    for line in stderr.splitlines():
+        if line == _MARK: inside = not inside
+        elif inside and line.startswith("import time:"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if not name.startswith("  "): total += int(cumulative)
+    return total / 1e6
+
+def cold_run(script, tmp_path):
+    env = dict(os.environ, ESTIMATE_DB_PATH=str(tmp_path / "estimates.db"), PYTHONPATH=ROOT)
+    env.pop("DENZAI_PROFILE", None)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _CHILD, os.path.join(ROOT, script)], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    run = json.loads(proc.stdout.strip().splitlines()[-1])
+    run["import"] = _import_seconds(proc.stderr)
+    return run
+
+@pytest.mark.parametrize("script", list(DEFERRED))
+def test_bench_cold_start(bench, request, tmp_path, script):
+    runs = [cold_run(script, tmp_path) for _ in range(request.config.getoption("--bench-rounds"))]
+    assert not runs[0]["errors"], runs[0]["errors"]
+    name = os.path.splitext(os.path.basename(script))[0]
+    rss = statistics.median(r["rss_mb"] for r in runs)
+    bench.record(f"startup.first_render[{name}]", statistics.median(r["first"] for r in runs), rss, 1, unit="renders")
+    bench.record(f"startup.import[{name}]", statistics.median(r["import"] for r in runs), rss, 1, unit="renders")
+    loaded = [m for m in DEFERRED[script] if m in runs[0]["modules"]]
+    assert not loaded, f"最初の描画で読み込まれた: {loaded}"
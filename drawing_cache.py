@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# ==========================================
+# 図面画像のキャッシュ（縮小ピラミッド + LRU）
+# ==========================================
+# キャンバスの最大幅 (base_width 800 × 最大ズーム 3.0) を超える解像度は使わないので、
+# 取り込み時にそこまで縮小してから 1/2 ずつのピラミッドを作る。
+MAX_CANVAS_WIDTH = 2400
+MIN_CANVAS_WIDTH = 400
+DEFAULT_BUDGET_MB = int(os.environ.get("DRAWING_CACHE_MB", "512"))
+
+def content_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+def decode_drawing(data, max_width=MAX_CANVAS_WIDTH):
+    image = Image.open(io.BytesIO(data))
+    # JPEG は DCT の段階で縮小デコードできる（フル解像度を展開しない）
+    image.draft("RGB", (max_width, max(1, max_width * image.height // image.width)))
+    image = image.convert("RGB")
+    if image.width > max_width:
+        image = image.resize((max_width, max(1, round(image.height * max_width / image.width))), Image.LANCZOS)
+    return image
+
+def build_pyramid(image, min_width=MIN_CANVAS_WIDTH):
+    levels = [image]
+    while levels[-1].width // 2 >= min_width:
+        prev = levels[-1]
+        levels.append(prev.reduce(2))
+    return levels
+
+def _nbytes(image):
+    return image.width * image.height * len(image.getbands())
+
+class DrawingCache:
+    """全セッション共有の図面キャッシュ。ピラミッドと描画幅ごとの縮小画像を合計バイト数で LRU 管理する。"""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self.used = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (image or pyramid, nbytes)
+
+    def _put(self, key, value, nbytes):
+        self._entries[key] = (value, nbytes)
+        self._entries.move_to_end(key)
+        self.used += nbytes
+        while self.used > self.budget and len(self._entries) > 1:
+            _, (_, freed) = self._entries.popitem(last=False)
+            self.used -= freed
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None: return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def add(self, data):
+        """画像バイト列を取り込み、内容ハッシュを返す（同じ内容なら再デコードしない）。"""
+        digest = content_digest(data)
+        with self._lock:
+            if self._get(("pyramid", digest)) is not None: return digest
+        pyramid = build_pyramid(decode_drawing(data))
+        with self._lock:
+            if ("pyramid", digest) not in self._entries:
+                self._put(("pyramid", digest), pyramid, sum(_nbytes(p) for p in pyramid))
+        return digest
+
+    def render(self, digest, width, loader=None):
+        """幅 width に縮小した図面を返す。追い出されていたら loader() のバイト列から作り直す。"""
+        with self._lock:
+            image = self._get(("render", digest, width))
+            if image is not None: return image
+            pyramid = self._get(("pyramid", digest))
+        if pyramid is None:
+            if loader is None: return None
+            digest = self.add(loader())
+            with self._lock: pyramid = self._get(("pyramid", digest))
+        # 要求幅以上で最も小さい段から縮小する
+        src = next((p for p in reversed(pyramid) if p.width >= width), pyramid[0])
+        height = max(1, round(src.height * width / src.width))
+        image = src if src.width == width else src.resize((width, height), Image.LANCZOS)
+        with self._lock:
+            if ("render", digest, width) not in self._entries: self._put(("render", digest, width), image, _nbytes(image))
+        return image
+
+    def render_page(self, digest, page, width, rasterize):
+        """複数ページの図面 (PDF) の1ページ。メモリに無ければ rasterize(page, width) で作る。"""
+        key = ("page", digest, page, width)
+        with self._lock:
+            image = self._get(key)
+            if image is not None: return image
+        image = rasterize(page, width)
+        with self._lock:
+            if key not in self._entries: self._put(key, image, _nbytes(image))
+        return image
@@ -0,0 +1,162 @@
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+from estimate_store import COLUMNS, EstimateStore
+
+# ==========================================
+# 見積の保存 (SQLite)
+# ==========================================
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "estimates.db")
+JOB_COLUMNS = ["id", "client_name", "hm_name", "src", "tgt", "color", "grand_total", "line_count", "created_at", "updated_at"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_name TEXT NOT NULL DEFAULT '',
+    hm_name TEXT NOT NULL DEFAULT '',
+    src TEXT NOT NULL DEFAULT '',
+    tgt TEXT NOT NULL DEFAULT '',
+    color TEXT NOT NULL DEFAULT 'std',
+    grand_total INTEGER NOT NULL DEFAULT 0,
+    line_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_client ON jobs(client_name);
+CREATE INDEX IF NOT EXISTS idx_jobs_hm ON jobs(hm_name);
+CREATE INDEX IF NOT EXISTS idx_jobs_series ON jobs(src, tgt);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at);
+CREATE TABLE IF NOT EXISTS lines (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    type TEXT, name TEXT, detail TEXT,
+    unit_diff INTEGER, qty INTEGER, total_diff INTEGER,
+    src TEXT, tgt TEXT, color TEXT, spec TEXT,
+    PRIMARY KEY (job_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS configs (
+    name TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+class EstimateDB:
+    """プロセスで1本の接続を使い回す見積DB。Streamlit の各セッション(スレッド)からはロック越しに使う。"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("ESTIMATE_DB_PATH", DEFAULT_DB_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def save(self, store, client_name="", hm_name="", src="", tgt="", color="std", job_id=None):
+        """見積を保存して job_id を返す。既存の job_id なら行をまとめて置き換える。"""
+        df = store.frame()
+        values = [df[c].tolist() for c in COLUMNS]
+        now = time.time()
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                if job_id is None or cur.execute("SELECT 1 FROM jobs WHERE id=?", (job_id,)).fetchone() is None:
+                    cur.execute("INSERT INTO jobs (client_name, hm_name, src, tgt, color, grand_total, line_count, created_at, updated_at)"
+                                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (client_name, hm_name, src, tgt, color, int(store.grand_total), len(store), now, now))
+                    job_id = cur.lastrowid
+                else:
+                    cur.execute("UPDATE jobs SET client_name=?, hm_name=?, src=?, tgt=?, color=?, grand_total=?, line_count=?,"
+                                " updated_at=? WHERE id=?",
+                                (client_name, hm_name, src, tgt, color, int(store.grand_total), len(store), now, job_id))
+                    cur.execute("DELETE FROM lines WHERE job_id=?", (job_id,))
+                rows = zip(itertools.repeat(job_id), range(len(df)), *values)
+                cur.executemany(f"INSERT INTO lines (job_id, seq, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 2))})", rows)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def load(self, job_id):
+        """(job の dict, EstimateStore) を返す。無ければ (None, None)。"""
+        with self._lock:
+            job = self._conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id=?", (job_id,)).fetchone()
+            if job is None: return None, None
+            rows = self._conn.execute(f"SELECT {', '.join(COLUMNS)} FROM lines WHERE job_id=? ORDER BY seq", (job_id,)).fetchall()
+        import pandas as pd
+        store = EstimateStore()
+        store.extend(pd.DataFrame(rows, columns=COLUMNS))
+        return dict(zip(JOB_COLUMNS, job)), store
+
+    def duplicate(self, job_id):
+        """見積を複製して新しい job_id を返す。元の見積が無ければ None。"""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.execute("INSERT INTO jobs (client_name, hm_name, src, tgt, color, grand_total, line_count, created_at, updated_at)"
+                            " SELECT client_name || ' (コピー)', hm_name, src, tgt, color, grand_total, line_count, ?, ? FROM jobs WHERE id=?",
+                            (now, now, job_id))
+                if cur.rowcount == 0:  # 元が無い (lastrowid は前回の INSERT のまま)
+                    cur.execute("ROLLBACK")
+                    return None
+                new_id = cur.lastrowid
+                cur.execute(f"INSERT INTO lines (job_id, seq, {', '.join(COLUMNS)})"
+                            f" SELECT ?, seq, {', '.join(COLUMNS)} FROM lines WHERE job_id=?", (new_id, job_id))
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return new_id
+
+    def search(self, text="", src=None, tgt=None, limit=50):
+        """施主名・HM名の部分一致と、変更元/変更先シリーズで絞り込む。新しい順。"""
+        where, params = [], []
+        if text:
+            like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("(client_name LIKE ? ESCAPE '\\' OR hm_name LIKE ? ESCAPE '\\')"); params += [like, like]
+        if src: where.append("src=?"); params.append(src)
+        if tgt: where.append("tgt=?"); params.append(tgt)
+        sql = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+        if where: sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY updated_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [dict(zip(JOB_COLUMNS, r)) for r in rows]
+
+    def portfolio(self):
+        """全見積の (jobs, lines) DataFrame。一括再計算 (repricing.py) 用。"""
+        import pandas as pd
+        with self._lock:
+            jobs = pd.read_sql_query(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs ORDER BY id", self._conn)
+            lines = pd.read_sql_query("SELECT job_id, spec, src, tgt, color, qty, total_diff FROM lines", self._conn)
+        lines[["spec", "src", "tgt", "color"]] = lines[["spec", "src", "tgt", "color"]].fillna("")
+        return jobs, lines
+
+    # 多連構成カタログ (gang_catalog.py)
+    def save_config(self, name, spec):
+        """名前付きで構成 (gang_spec) を保存する。同じ名前は上書き。"""
+        with self._lock:
+            self._conn.execute("INSERT INTO configs (name, spec, updated_at) VALUES (?, ?, ?)"
+                               " ON CONFLICT(name) DO UPDATE SET spec=excluded.spec, updated_at=excluded.updated_at",
+                               (name, spec, time.time()))
+
+    def configs(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT name, spec FROM configs ORDER BY name").fetchall()
+        return [{"name": n, "spec": s} for n, s in rows]
+
+    def delete_config(self, name):
+        with self._lock:
+            self._conn.execute("DELETE FROM configs WHERE name=?", (name,))
@@ -0,0 +1,118 @@
+import hashlib
+
+import numpy as np
+
+# ==========================================
+# 列指向の見積ストア
+# ==========================================
+# 見積行を列ごとの型付き配列で持つ。追加は償却 O(1)、合計・種類別小計は追加時に更新する。
+#   カテゴリ列 (type/name/src/tgt/color/spec) : int32 コード + カテゴリ一覧
+#   detail : object 配列 / qty : int32 / unit_diff, total_diff : int64 (円)
+# pandas は DataFrame を受け渡すときだけ読み込む（空の見積を開くだけなら不要）。
+CATEGORY_COLUMNS = ("type", "name", "src", "tgt", "color", "spec")
+COLUMNS = ["type", "name", "detail", "unit_diff", "qty", "total_diff", "src", "tgt", "color", "spec"]
+_DTYPES = {"detail": object, "unit_diff": np.int64, "qty": np.int32, "total_diff": np.int64}
+_INITIAL_CAPACITY = 64
+
+class EstimateStore:
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._n = 0
+        self._cap = _INITIAL_CAPACITY
+        self._cols = {c: np.empty(self._cap, dtype=_DTYPES.get(c, np.int32)) for c in COLUMNS}
+        self._cats = {c: [] for c in CATEGORY_COLUMNS}
+        self._cat_index = {c: {} for c in CATEGORY_COLUMNS}
+        self.grand_total = 0
+        self.subtotals = {}
+        self.revision = 0
+        self._digest = None
+
+    def __len__(self):
+        return self._n
+
+    def __bool__(self):
+        return self._n > 0
+
+    def _reserve(self, extra):
+        need = self._n + extra
+        if need <= self._cap: return
+        while self._cap < need: self._cap *= 2
+        for c, arr in self._cols.items():
+            grown = np.empty(self._cap, dtype=arr.dtype)
+            grown[:self._n] = arr[:self._n]
+            self._cols[c] = grown
+
+    def _code(self, column, value):
+        index = self._cat_index[column]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self._cats[column])
+            self._cats[column].append(value)
+        return code
+
+    def _touch(self):
+        self.revision += 1
+        self._digest = None
+
+    def append(self, type, name, detail, unit_diff, qty, src="", tgt="", color="std", spec=""):
+        unit_diff = int(round(unit_diff)); qty = int(qty)
+        self._reserve(1)
+        i = self._n
+        row = {"type": type, "name": name, "src": src, "tgt": tgt, "color": color, "spec": spec}
+        for c, v in row.items(): self._cols[c][i] = self._code(c, v)
+        self._cols["detail"][i] = detail
+        self._cols["unit_diff"][i] = unit_diff
+        self._cols["qty"][i] = qty
+        self._cols["total_diff"][i] = unit_diff * qty
+        self._n += 1
+        self.grand_total += unit_diff * qty
+        self.subtotals[type] = self.subtotals.get(type, 0) + unit_diff * qty
+        self._touch()
+
+    def extend(self, df):
+        """COLUMNS を持つ DataFrame をまとめて追加する（total_diff は無くてもよい）。"""
+        import pandas as pd
+        n = len(df)
+        if n == 0: return
+        self._reserve(n)
+        sl = slice(self._n, self._n + n)
+        for c in CATEGORY_COLUMNS:
+            values = df[c] if c in df.columns else pd.Series([""] * n)
+            uniques, inverse = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+            codes = np.array([self._code(c, u) for u in uniques], dtype=np.int32)
+            self._cols[c][sl] = codes[inverse]
+        unit = np.rint(df["unit_diff"].to_numpy(dtype=np.float64)).astype(np.int64)
+        qty = df["qty"].to_numpy(dtype=np.int64)
+        total = unit * qty
+        self._cols["detail"][sl] = df["detail"].to_numpy(dtype=object)
+        self._cols["unit_diff"][sl] = unit
+        self._cols["qty"][sl] = qty
+        self._cols["total_diff"][sl] = total
+        self._n += n
+        self.grand_total += int(total.sum())
+        by_type = pd.Series(total).groupby(np.asarray(df["type"], dtype=object)).sum()
+        for t, v in by_type.items(): self.subtotals[t] = self.subtotals.get(t, 0) + int(v)
+        self._touch()
+
+    def frame(self, columns=None):
+        """先頭 n 行を指す DataFrame。数値列は内部配列のビューでコピーしない。"""
+        import pandas as pd
+        data = {}
+        for c in columns or COLUMNS:
+            arr = self._cols[c][:self._n]
+            data[c] = pd.Categorical.from_codes(arr, categories=pd.Index(self._cats[c], dtype=object), validate=False) \
+                if c in self._cats else arr
+        return pd.DataFrame(data, copy=False)
+
+    def digest(self):
+        if self._digest is None:
+            h = hashlib.sha1()
+            for c in COLUMNS:
+                if c == "detail": h.update("\x00".join(map(str, self._cols[c][:self._n])).encode("utf-8"))
+                else: h.update(self._cols[c][:self._n].tobytes())
+                if c in self._cats: h.update("\x00".join(self._cats[c]).encode("utf-8"))
+            self._digest = h.hexdigest()
+        return self._digest
@@ -0,0 +1,46 @@
+import io
+
+# ==========================================
+# 見積書の書き出し (Excel / CSV / Parquet)
+# ==========================================
+# xlsxwriter は Excel を作るときだけ読み込む。
+ESTIMATE_COLUMNS = ["type", "name", "detail", "unit_diff", "qty", "total_diff"]
+ESTIMATE_HEADERS = ["種類", "品名", "詳細", "単価差額", "数量", "差額合計"]
+EXPORT_FORMATS = {
+    "Excel": ("見積.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("見積.csv", "text/csv"),
+    "Parquet": ("見積.parquet", "application/octet-stream"),
+}
+
+def to_excel(df, client, hm, src, tgt, total):
+    import xlsxwriter
+    # constant_memory: 行を書いたそばから一時ファイルへ流すので、行数が増えてもメモリは一定
+    output = io.BytesIO()
+    wb = xlsxwriter.Workbook(output, {'constant_memory': True})
+    ws = wb.add_worksheet("差額見積")
+    fmt_head = wb.add_format({'bold': True, 'bg_color': '#cceeff', 'border': 1})
+    fmt_total = wb.add_format({'bold': True})
+    ws.write(0, 0, f"施主: {client}")
+    ws.write(1, 0, f"HM: {hm}")
+    ws.write(2, 0, f"{src} ➡ {tgt}")
+    ws.write_row(4, 0, ESTIMATE_HEADERS, fmt_head)
+    r = 5
+    for row in df[ESTIMATE_COLUMNS].itertuples(index=False, name=None):
+        ws.write_row(r, 0, row); r += 1
+    ws.write(r, 5, total, fmt_total)
+    wb.close()
+    return output.getvalue()
+
+def to_csv(df):
+    return df[ESTIMATE_COLUMNS].rename(columns=dict(zip(ESTIMATE_COLUMNS, ESTIMATE_HEADERS))).to_csv(index=False).encode("utf-8_sig")
+
+def to_parquet(df):
+    output = io.BytesIO()
+    df[ESTIMATE_COLUMNS].to_parquet(output, index=False)
+    return output.getvalue()
+
+def build_export(fmt, df, client, hm, src, tgt, total):
+    if fmt == "Excel": return to_excel(df, client, hm, src, tgt, total)
+    if fmt == "CSV": return to_csv(df)
+    if fmt == "Parquet": return to_parquet(df)
+    raise ValueError(f"未対応の形式です: {fmt}")
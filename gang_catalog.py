@@ -0,0 +1,30 @@
+import numpy as np
+
+from estimate_store import COLUMNS
+from pricing import parse_spec
+
+# ==========================================
+# 多連構成カタログ
+# ==========================================
+# よく使う多連の割り付けに名前を付けて保存し (estimate_db の configs 表)、
+# 数量を入れた分をまとめて見積に追加する。構成は gang_spec の正規化 JSON で持つので、
+# 同じ割り付けは同じ文字列になり、DiffTable.spec_diff の (構成, 変更元, 変更先, 色) ごとのメモがそのまま効く。
+def spec_configs(spec):
+    """gang_spec → column_configs。"""
+    return [{"items": list(items), "handle": h, "is_name": n} for items, h, n in parse_spec(spec)[1]]
+
+def config_detail(column_configs, items):
+    """見積の詳細欄 "[single]片切 / [double]ほたる,3路" を作る。"""
+    return " / ".join(f"[{c['handle']}]{','.join(items[i]['name'] for i in c['items'])}" for c in column_configs)
+
+def catalog_lines(entries, diff_table, src, tgt, color):
+    """(spec, qty) の並びを見積ストアに extend できる DataFrame にする。同じ構成は1回だけ計算する。"""
+    import pandas as pd
+    items = diff_table.tables.items
+    specs = [spec for spec, _ in entries]
+    qty = np.array([int(q) for _, q in entries], dtype=np.int64)
+    memo = {spec: (diff_table.spec_diff(spec, src, tgt, color), spec_configs(spec)) for spec in set(specs)}
+    unit_diff = np.rint([memo[s][0] for s in specs]).astype(np.int64)
+    return pd.DataFrame({"type": [f"{len(memo[s][1])}連カスタム" for s in specs], "name": "詳細構成セット",
+                         "detail": [config_detail(memo[s][1], items) for s in specs], "unit_diff": unit_diff, "qty": qty,
+                         "total_diff": unit_diff * qty, "src": src, "tgt": tgt, "color": color, "spec": specs}, columns=COLUMNS)
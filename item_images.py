@@ -0,0 +1,35 @@
+import html
+import io
+import os
+
+# ==========================================
+# 部材画像のサムネイル
+# ==========================================
+# ITEMS_DB の img_file を部材ごとに1回だけ読み、表示サイズへ縮小して圧縮済みのバイト列で持つ。
+# 画像が無い部材は、アイコンを表示する HTML を先に作っておく。PIL は画像を縮小するときだけ読み込む。
+IMG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "img")
+THUMB_SIZE = 320  # 詳細ビルダーの列幅 (3連でも) に足りる大きさ
+
+def make_thumbnail(path, size=THUMB_SIZE):
+    """画像ファイルを size 四方に収まるよう縮小し、PNG (透過あり) か JPEG のバイト列にする。"""
+    from PIL import Image
+    with Image.open(path) as img:
+        img.draft("RGB", (size, size))
+        img.thumbnail((size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        if img.mode in ("RGBA", "LA", "P"):
+            img.save(out, "PNG", optimize=True)
+        else:
+            img.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+    return out.getvalue()
+
+def fallback_html(icon):
+    return f"<h1 style='text-align: center; color: #ccc;'>{html.escape(str(icon))}</h1>"
+
+def build_thumbnail(item, img_dir=IMG_DIR, size=THUMB_SIZE):
+    """("image", bytes) または ("icon", html)。読めない画像はアイコン扱いにする。"""
+    path = os.path.join(img_dir, item.get("img_file", "") or "")
+    try:
+        return ("image", make_thumbnail(path, size)) if os.path.isfile(path) else ("icon", fallback_html(item["icon"]))
+    except OSError:
+        return ("icon", fallback_html(item["icon"]))
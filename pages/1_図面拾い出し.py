@@ -0,0 +1,278 @@
+import io
+import json
+import streamlit as st
+from pickup_core import PICKUP_ITEMS, ERASE_COLOR, MarkerTally, detections_to_markers, markers_to_drawing
+import perf
+
+# ==========================================
+# 1. アプリ基本設定
+# ==========================================
+st.set_page_config(page_title="図面拾い出しツール", layout="wide")
+
+# ==========================================
+# 2. UI改善：スクロールバー強制表示CSS
+# ==========================================
+st.markdown("""
+    <style>
+    /* 1. アプリ全体の横スクロールを許可する設定 */
+    .stApp > header {background-color: transparent;}
+    .main .block-container {
+        max-width: 100%;
+        padding-left: 2rem;
+        padding-right: 2rem;
+        overflow-x: auto !important; /* 強制的にスクロールさせる */
+    }
+
+    /* 2. スクロールバー自体のデザイン（太く、見やすく） */
+    ::-webkit-scrollbar {
+        height: 20px !important; /* バーの高さ(太さ) */
+        width: 20px !important;
+    }
+    ::-webkit-scrollbar-track {
+        background: #f0f0f0; 
+        border-radius: 10px;
+    }
+    ::-webkit-scrollbar-thumb {
+        background: #888; 
+        border-radius: 10px;
+        border: 4px solid #f0f0f0; /* 余白を持たせて浮き出るように */
+    }
+    ::-webkit-scrollbar-thumb:hover {
+        background: #555; 
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+# DENZAI_PROFILE=1 または ?profile=1 のときだけ区間ごとの時間を計る（perf.py）
+perf.start_run("図面拾い出し")
+
+# ==========================================
+# 3. マーカーの色定義
+# ==========================================
+# PICKUP_ITEMS と見積部材への対応表は pickup_core.py に定義
+
+# 見積画面の施主名・HM名はページを移動しても消えないよう保持しておく
+for k in ("client_name", "hm_name"):
+    if k in st.session_state: st.session_state[k] = st.session_state[k]
+
+# ==========================================
+# 4. サイドバー
+# ==========================================
+perf.mark("サイドバー")
+st.sidebar.header("🛠️ 拾い出し操作パネル")
+
+# ズーム機能
+st.sidebar.subheader("🔍 表示設定")
+zoom_rate = st.sidebar.slider("図面のズーム倍率", 0.5, 3.0, 1.0, 0.1)
+
+st.sidebar.info("""
+**💡 ヒント**
+スクロールバーは**画面の一番下**に表示されます。
+図面が縦に長い場合は、まず下までスクロールしてバーを確認してください。
+""")
+
+st.sidebar.markdown("---")
+
+st.sidebar.subheader("1. 何を数えますか？")
+target_item_key = st.sidebar.radio(
+    "アイテムを選択",
+    list(PICKUP_ITEMS.keys()),
+    format_func=lambda x: PICKUP_ITEMS[x]["name"],
+    key="target_radio"
+)
+
+erase_mode = st.sidebar.toggle("✂️ 消しゴム（誤検出・打ち間違いを消す）", key="erase_mode")
+current_color = ERASE_COLOR if erase_mode else PICKUP_ITEMS[target_item_key]["color"]
+
+st.sidebar.markdown(f"""
+<div style="background-color: {current_color}; padding: 10px; border-radius: 5px; color: black; font-weight: bold; text-align: center; border: 1px solid #ccc;">
+    現在のマーカー色
+</div>
+""", unsafe_allow_html=True)
+
+stroke_width = st.sidebar.slider("マーカーの大きさ", 5, 40, 20)
+
+# 自動検出：検出した記号を仮置きし、人は確認と修正だけを行う
+st.sidebar.markdown("---")
+st.sidebar.subheader("2. 記号の自動検出")
+symbol_px = st.sidebar.slider("図面上の記号の大きさ（倍率1.0でのpx）", 6, 40, 14)
+match_threshold = st.sidebar.slider("一致度のしきい値（上げると誤検出が減る）", 0.4, 0.9, 0.6, 0.05)
+st.sidebar.caption("● は片切と3路・4路 (数字を傍記) の区別が付かないため、symbols/sw_3way・sw_4way に見本を置くまでは"
+                   "灰色の「要確認」として置き、個数には数えません。")
+
+# ==========================================
+# 5. メイン画面
+# ==========================================
+perf.mark("メイン画面")
+st.title("🗺️ 図面デジタル拾い出しツール")
+
+uploaded_file = st.file_uploader("図面をアップロード (PNG, JPG, PDF)", type=["png", "jpg", "jpeg", "pdf"])
+
+# 図面はプロセス共有のキャッシュで1回だけデコードし、表示幅に縮小した画像だけをキャンバスへ渡す
+# 画像処理 (PIL・pypdfium2)・キャンバス・記号検出のモジュールは図面をアップロードしてから読み込む
+@st.cache_resource
+def load_drawing_cache():
+    from drawing_cache import DrawingCache
+    return DrawingCache()
+
+# PDF のページはディスクにも保存し、容量上限を超えたら古いものから消す
+@st.cache_resource
+def load_page_cache():
+    from pdf_pages import PageCache
+    return PageCache()
+
+@st.cache_resource
+def load_symbol_templates():
+    from symbol_detect import load_templates
+    return load_templates()
+
+# 同じ図面・同じ条件の検出は使い回す（画像は内容ハッシュ digest で識別）
+@st.cache_data(max_entries=16, show_spinner=False)
+def run_detection(digest, width, symbol_px, threshold, _image):
+    from symbol_detect import detect_symbols
+    return detect_symbols(_image, symbol_px, threshold, load_symbol_templates())
+
+if uploaded_file:
+    from streamlit_drawable_canvas import st_canvas
+    from drawing_cache import MAX_CANVAS_WIDTH, content_digest
+    from pdf_pages import is_pdf, page_sizes
+    drawing_cache = load_drawing_cache()
+
+    # アップロード時は PDF ならページ数だけを調べ、各ページは開いたときに描画する
+    drawing = st.session_state.get("pickup_drawing")
+    if drawing is None or drawing["file_id"] != uploaded_file.file_id:
+        data = uploaded_file.getvalue()
+        try:
+            if is_pdf(data):
+                drawing = {"file_id": uploaded_file.file_id, "digest": content_digest(data), "pdf": True, "pages": len(page_sizes(data))}
+            else:
+                drawing = {"file_id": uploaded_file.file_id, "digest": drawing_cache.add(data), "pdf": False, "pages": 1}
+        except Exception as e:
+            st.error(f"図面を読み込めませんでした: {e}"); st.stop()
+        st.session_state.pickup_drawing = drawing
+        st.session_state.pickup_tallies = [MarkerTally() for _ in range(drawing["pages"])]
+        st.session_state.pop("pickup_page", None)
+        st.session_state.pop("pickup_view", None)
+    tallies = st.session_state.pickup_tallies
+
+    page = 0
+    if drawing["pages"] > 1:
+        page = st.selectbox("ページ", range(drawing["pages"]), key="pickup_page",
+                            format_func=lambda i: f"{i + 1} / {drawing['pages']} ページ")
+
+    def render_drawing(width):
+        if drawing["pdf"]:
+            return drawing_cache.render_page(drawing["digest"], page, width,
+                                             lambda p, w: load_page_cache().render(uploaded_file.getvalue(), drawing["digest"], p, w))
+        return drawing_cache.render(drawing["digest"], width, loader=uploaded_file.getvalue)
+
+    # ズーム計算
+    base_width = 800
+    canvas_width = int(base_width * zoom_rate)
+    with perf.section("図面の読込・縮小"):
+        image = render_drawing(canvas_width)
+    canvas_height = image.height
+
+    # マーカーは図面座標で保持し、倍率が変わったときだけ新しいサイズへ投影してキャンバスに読み込ませる。
+    # キャンバスは key 固定の1つだけなので、ズームしても作り直さず打ったマーカーも消えない。
+    # ページごとに別の集計を持ち、ページを切り替えたら前のページの値が届いても取り込まない。
+    tally = tallies[page]
+    view = st.session_state.get("pickup_view")
+    if view is not None and view["page"] != page: tally.replace(tally.markers)
+
+    # 記号が TEMPLATE_SIZE px 程度になる幅で照合し、結果を仮置きマーカーとしてキャンバスに読み込ませる
+    if st.sidebar.button("🔍 記号を検出して仮置き", key="btn_detect", use_container_width=True):
+        from symbol_detect import TEMPLATE_SIZE
+        detect_width = min(MAX_CANVAS_WIDTH, round(base_width * TEMPLATE_SIZE / symbol_px))
+        detect_image = render_drawing(detect_width)
+        with st.spinner("記号を検出しています..."):
+            with perf.section("記号検出"):
+                detections = run_detection(f"{drawing['digest']}#{page}", detect_width, symbol_px * detect_width / base_width,
+                                           match_threshold, detect_image)
+        tally.replace(detections_to_markers(detections, tally.markers, canvas_width, canvas_height, stroke_width / 2))
+        st.sidebar.success(f"{len(detections)} 個を検出しました。図面上で確認してください。")
+    if tally.pending:
+        st.sidebar.caption(f"未確認の仮置き: {tally.pending} 個（黒枠のマーカー）。誤りは消しゴムで消し、足りない分は手で打ってください。")
+        if tally.needs_review:
+            st.sidebar.warning(f"要確認（灰色）: {tally.needs_review} 個。片切・3路・4路のどれか傍記の数字を見て、"
+                               "消しゴムで消してから正しい分類で打ち直してください（確定しても数えません）。")
+        c1, c2 = st.sidebar.columns(2)
+        if c1.button("✅ 仮置きを確定", key="btn_confirm", use_container_width=True): tally.confirm()
+        if c2.button("🗑️ 仮置きを取消", key="btn_discard", use_container_width=True):
+            tally.replace(detections_to_markers([], tally.markers, canvas_width, canvas_height, stroke_width / 2))
+
+    if view is None or view["page"] != page or view["size"] != (canvas_width, canvas_height) or view["revision"] != tally.revision:
+        view = {"page": page, "size": (canvas_width, canvas_height), "revision": tally.revision,
+                "drawing": markers_to_drawing(tally.markers, canvas_width, canvas_height, [page, tally.revision])}
+        st.session_state.pickup_view = view
+
+    st.markdown("---")
+    st.caption(f"▼ 図面エリア（{page + 1} ページ目 / 現在の倍率: {zoom_rate}倍）")
+    
+    # ここにスクロール可能なコンテナを作成（念のため）
+    with st.container():
+        # キャンバス設定
+        canvas_result = st_canvas(
+            fill_color=current_color,
+            stroke_color=current_color,
+            stroke_width=stroke_width,
+            background_image=image,
+            update_streamlit=True,
+            height=canvas_height,
+            width=canvas_width,
+            drawing_mode="point",
+            initial_drawing=view["drawing"],
+            display_toolbar=True,
+            key="canvas_pickup",
+        )
+    # st_canvas は背景を PNG にして、初期図形は JSON で毎回送る
+    def _png_size(img):
+        buf = io.BytesIO(); img.save(buf, "PNG")
+        return buf.tell()
+    perf.payload("キャンバス背景", lambda: _png_size(image))
+    perf.payload("キャンバス初期図形", lambda: len(json.dumps(view["drawing"])))
+
+    # ==========================================
+    # 6. 集計ロジック
+    # ==========================================
+    # 前回から増えた/減ったマーカーだけを処理して色ごとの個数を更新する（ズーム直後の古い値は取り込まない）
+    perf.mark("集計")
+    if canvas_result.json_data is not None:
+        with perf.section("キャンバス集計"):
+            tally.sync(canvas_result.json_data["objects"], canvas_width, canvas_height)
+        if tally.revision != view["revision"]: st.rerun()  # 消しゴムで消えた分をキャンバスに反映する
+    if canvas_result.json_data is not None or any(t.markers for t in tallies):
+        # 全ページの合計（見積へ渡すのはこちら）
+        counts = {k: sum(t.counts[k] for t in tallies) for k in PICKUP_ITEMS}
+
+        # 結果表示
+        st.sidebar.markdown("---")
+        st.sidebar.header("📊 集計結果")
+        import pandas as pd
+        results_df = pd.DataFrame([
+            {"アイテム": PICKUP_ITEMS[k]["name"], "個数": v} for k, v in counts.items()
+        ])
+        if len(tallies) > 1:
+            results_df.insert(1, "このページ", [tally.counts[k] for k in PICKUP_ITEMS])
+        st.sidebar.dataframe(results_df, hide_index=True, use_container_width=True)
+        
+        total = sum(t.total for t in tallies)
+        st.sidebar.metric("合計マーク数", f"{total} 個")
+        
+        csv = results_df.to_csv(index=False).encode('utf-8_sig')
+        st.sidebar.download_button(
+            "📥 CSVをダウンロード",
+            csv,
+            "pickup_result.csv",
+            "text/csv"
+        )
+
+        # 見積アプリへそのまま渡す（再入力・CSVの再アップロード不要）
+        if st.sidebar.button("📤 この個数で差額見積へ", disabled=bool(total == 0), key="btn_handoff"):
+            st.session_state.pickup_handoff = {"counts": counts, "source": uploaded_file.name}
+            st.switch_page("app.py")
+
+else:
+    st.info("👆 画像ファイルをアップロードしてください。")
+
+perf.finish_run()
\ No newline at end of file
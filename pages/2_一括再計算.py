@@ -0,0 +1,69 @@
+import hashlib
+import os
+import tempfile
+import streamlit as st
+from pricing import COLOR_TYPES, DiffTable
+from price_master import compile_catalog, read_catalog
+from resources import load_estimate_db, load_master, warn_master_error
+from repricing import REPORT_COLUMNS, REPORT_HEADERS, reprice
+
+# ==========================================
+# 1. アプリ基本設定
+# ==========================================
+st.set_page_config(page_title="見積の一括再計算", layout="wide")
+
+# 見積画面の施主名・HM名はページを移動しても消えないよう保持しておく
+for k in ("client_name", "hm_name"):
+    if k in st.session_state: st.session_state[k] = st.session_state[k]
+
+# アップロードされた価格マスタは内容ごとに1回だけ検証・コンパイルする
+@st.cache_resource(max_entries=4)
+def load_alt_diff_table(digest, _data, suffix):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "catalog" + suffix)
+        with open(path, "wb") as f: f.write(_data)
+        return DiffTable(compile_catalog(read_catalog(path)))
+
+# ==========================================
+# 2. 条件
+# ==========================================
+st.title("🔁 保存済み見積の一括再計算")
+st.caption("価格改定やシリーズ変更の影響を、保存済みの全見積で旧合計／新合計として比べます。")
+
+price_master, current, current_diff_table = load_master()
+warn_master_error(price_master)
+series_keys = list(current.series_names)
+c1, c2, c3 = st.columns(3)
+with c1: src = st.selectbox("変更元", [""] + series_keys, format_func=lambda x: current.series_names.get(x, "（各見積のまま）"))
+with c2: tgt = st.selectbox("変更先", [""] + series_keys, format_func=lambda x: current.series_names.get(x, "（各見積のまま）"))
+with c3: color = st.selectbox("色", [""] + list(COLOR_TYPES), format_func=lambda x: {"std": "標準色", "black": "黒"}.get(x, "（各見積のまま）"))
+catalog_file = st.file_uploader("新しい価格マスタ (CSV/Excel、未指定なら現在のマスタ)", type=["csv", "xlsx", "xlsm"])
+
+diff_table = None
+if catalog_file is not None:
+    data = catalog_file.getvalue()
+    try:
+        diff_table = load_alt_diff_table(hashlib.sha1(data).hexdigest(), data, os.path.splitext(catalog_file.name)[1].lower())
+    except ValueError as e:
+        st.error(str(e))
+else:
+    diff_table = current_diff_table
+
+# ==========================================
+# 3. 実行と結果
+# ==========================================
+if diff_table is not None and st.button("▶ 全見積を再計算", key="btn_reprice"):
+    jobs, lines = load_estimate_db().portfolio()
+    with st.spinner(f"{len(jobs)} 件を計算しています..."):
+        st.session_state.repricing_report = reprice(jobs, lines, diff_table, src or None, tgt or None, color or None)
+
+report = st.session_state.get("repricing_report")
+if report is not None:
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("見積数", f"{len(report):,} 件")
+    m2.metric("旧合計", f"¥ {report['old_total'].sum():,.0f}")
+    m3.metric("新合計", f"¥ {report['new_total'].sum():,.0f}", f"{report['change'].sum():+,.0f}")
+    m4.metric("計算できない行", f"{report['unpriced_lines'].sum():,} 行")
+    view = report.rename(columns=dict(zip(REPORT_COLUMNS, REPORT_HEADERS)))
+    st.dataframe(view.sort_values("増減", key=abs, ascending=False), hide_index=True, use_container_width=True)
+    st.download_button("📥 CSVをダウンロード", view.to_csv(index=False).encode("utf-8_sig"), "再計算結果.csv", "text/csv")
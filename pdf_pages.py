@@ -0,0 +1,103 @@
+import os
+import threading
+
+from PIL import Image
+
+from drawing_cache import MAX_CANVAS_WIDTH, MIN_CANVAS_WIDTH
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # PDF を使わないなら無くても動く
+    pdfium = None
+
+# ==========================================
+# PDF 図面セット（ページごとに必要な解像度だけラスタライズ）
+# ==========================================
+# アップロード時はページ数と用紙サイズ (pt) だけを読み、各ページは開いたときに
+# 表示幅以上の最小の段 (400, 800, 1600, 2400px) で描画する。描画結果はディスクに保存し、
+# 合計サイズが上限を超えたら古いものから消す。
+DEFAULT_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), ".page_cache"))
+DEFAULT_CACHE_MB = int(os.environ.get("PAGE_CACHE_MB", "1024"))
+
+def raster_widths(min_width=MIN_CANVAS_WIDTH, max_width=MAX_CANVAS_WIDTH):
+    widths = [min_width]
+    while widths[-1] * 2 < max_width: widths.append(widths[-1] * 2)
+    return tuple(widths + [max_width])
+
+RASTER_WIDTHS = raster_widths()
+
+def is_pdf(data):
+    return data[:5] == b"%PDF-"
+
+def _require_pdfium():
+    if pdfium is None: raise RuntimeError("PDF の読み込みには pypdfium2 が必要です (pip install pypdfium2)")
+
+def page_sizes(data):
+    """各ページの (幅, 高さ) [pt]。ページの中身は読まない。"""
+    _require_pdfium()
+    pdf = pdfium.PdfDocument(data)
+    try:
+        return [pdf.get_page_size(i) for i in range(len(pdf))]
+    finally:
+        pdf.close()
+
+def rasterize_page(data, page, width):
+    """page (0始まり) を幅 width px で描画した RGB 画像。"""
+    _require_pdfium()
+    pdf = pdfium.PdfDocument(data)
+    try:
+        p = pdf[page]
+        image = p.render(scale=width / p.get_width(), draw_annots=True).to_pil().convert("RGB")
+        p.close()
+    finally:
+        pdf.close()
+    return image
+
+class PageCache:
+    """ラスタライズ済みページのディスクキャッシュ (容量上限つき、古いものから削除)。"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, budget_mb=DEFAULT_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.budget = budget_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest, page, width):
+        return os.path.join(self.cache_dir, digest[:16], f"p{page:04d}_w{width}.png")
+
+    def _evict(self):
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        used = sum(f[1] for f in files)
+        for _, size, path in sorted(files):
+            if used <= self.budget: break
+            try:
+                os.remove(path); used -= size
+            except FileNotFoundError:
+                pass
+
+    def render(self, data, digest, page, width):
+        """幅 width のページ画像を返す。ディスクに無ければ必要な段だけ描画して保存する。"""
+        raster = next((w for w in RASTER_WIDTHS if w >= width), RASTER_WIDTHS[-1])
+        path = self._path(digest, page, raster)
+        try:
+            image = Image.open(path); image.load()
+            os.utime(path)  # 最近使ったものほど残す
+        except (FileNotFoundError, OSError):
+            image = rasterize_page(data, page, raster)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            image.save(tmp, "PNG", compress_level=1)
+            os.replace(tmp, path)
+            with self._lock: self._evict()
+        if image.width != width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        return image
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import streamlit as st
+
+# ==========================================
+# 再実行ごとの計測（オプトイン）
+# ==========================================
+# 環境変数 DENZAI_PROFILE=1、または URL に ?profile=1 を付けたセッションだけ計測する。
+# 区間の時間・セッションごとの再実行回数・ブラウザへ送るデータ量をサイドバーに出し、
+# 1回の再実行 = 1行の JSON としてローテーションするログファイルに追記する。
+#   perf.start_run("見積")          … スクリプトの先頭
+#   perf.mark("サイドバー")          … ここから次の mark までを1区間として計る
+#   with perf.section("Excel作成"):  … 入れ子の区間
+#   perf.payload("画像", lambda: n)  … 送信量 (計測時だけ関数を呼ぶ)
+#   perf.finish_run()               … スクリプトの末尾 (パネル表示とログ書き出し)
+ENV_VAR = "DENZAI_PROFILE"
+LOG_PATH = os.environ.get("PROFILE_LOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "perf.log"))
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 5
+_STATE_KEY = "_perf"
+_logger = None
+_logger_lock = threading.Lock()
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+            handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("denzai.perf")
+            logger.setLevel(logging.INFO); logger.propagate = False
+            logger.addHandler(handler)
+            _logger = logger
+    return _logger
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else ""
+    except Exception:
+        return ""
+
+def _state():
+    return st.session_state.get(_STATE_KEY)
+
+def start_run(page):
+    """再実行の計測を始める。前回の再実行が途中で終わっていれば (st.rerun 等) その分もログに残す。"""
+    state = st.session_state.get(_STATE_KEY)
+    if state is None:
+        state = st.session_state[_STATE_KEY] = {"enabled": False, "reruns": {}, "run": None}
+    # 一度有効にしたセッションは、URL のパラメータが消えても計測を続ける
+    if os.environ.get(ENV_VAR) == "1" or st.query_params.get("profile") == "1": state["enabled"] = True
+    if not state["enabled"]: return
+    if state["run"] is not None: _write(state["run"], complete=False)
+    state["reruns"][page] = state["reruns"].get(page, 0) + 1
+    now = time.perf_counter()
+    state["run"] = {"page": page, "session": _session_id(), "rerun": state["reruns"][page], "started": time.time(),
+                    "t0": now, "mark": None, "mark_t": now, "sections": [], "payloads": []}
+
+def mark(name):
+    """直前の mark からここまでを1区間として閉じ、name の区間を始める。"""
+    state = _state()
+    if state is None or state["run"] is None: return
+    run = state["run"]; now = time.perf_counter()
+    if run["mark"] is not None: run["sections"].append((run["mark"], now - run["mark_t"]))
+    run["mark"], run["mark_t"] = name, now
+
+@contextmanager
+def section(name):
+    state = _state()
+    if state is None or state["run"] is None:
+        yield; return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        state["run"]["sections"].append((name, time.perf_counter() - t0))
+
+def payload(kind, nbytes):
+    """ブラウザへ送るデータ量を記録する。nbytes は数値か、計測時だけ呼ぶ関数。"""
+    state = _state()
+    if state is None or state["run"] is None: return
+    t0 = time.perf_counter()
+    state["run"]["payloads"].append((kind, int(nbytes() if callable(nbytes) else nbytes)))
+    state["run"]["mark_t"] += time.perf_counter() - t0  # 計測のための処理時間は区間に含めない
+
+def _write(run, complete=True):
+    record = {"ts": round(run["started"], 3), "page": run["page"], "session": run["session"], "rerun": run["rerun"],
+              "complete": complete, "total_ms": round(run.get("total", 0) * 1000, 2),
+              "sections": {}, "payload_bytes": {}}
+    for name, sec in run["sections"]: record["sections"][name] = round(record["sections"].get(name, 0) + sec * 1000, 2)
+    for kind, n in run["payloads"]: record["payload_bytes"][kind] = record["payload_bytes"].get(kind, 0) + n
+    try:
+        _get_logger().info(json.dumps(record, ensure_ascii=False))
+    except OSError:
+        pass
+    return record
+
+def finish_run():
+    """区間を閉じ、サイドバーに計測パネルを出してログに書き出す。"""
+    state = _state()
+    if state is None or state["run"] is None: return
+    mark(None)
+    run = state["run"]; state["run"] = None
+    run["total"] = time.perf_counter() - run["t0"]
+    record = _write(run)
+    with st.sidebar.expander("🩺 計測（この再実行）", expanded=False):
+        st.caption(f"{record['page']} / 再実行 {record['rerun']} 回目 / 合計 {record['total_ms']:.1f} ms")
+        st.dataframe([{"区間": k, "ms": v} for k, v in sorted(record["sections"].items(), key=lambda kv: -kv[1])],
+                     hide_index=True, use_container_width=True)
+        if record["payload_bytes"]:
+            st.dataframe([{"送信データ": k, "KB": round(v / 1024, 1)} for k, v in record["payload_bytes"].items()],
+                         hide_index=True, use_container_width=True)
+        st.caption(f"ログ: {LOG_PATH}")
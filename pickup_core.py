@@ -0,0 +1,195 @@
+from takeoff_import import TAKEOFF_COLUMNS
+
+# ==========================================
+# 拾い出しの分類と見積部材の対応
+# ==========================================
+PICKUP_ITEMS = {
+    "sw_b": {"name": "① 片切スイッチ", "color": "rgba(255, 0, 0, 0.4)"},      # 赤
+    "sw_3way": {"name": "② 3路スイッチ", "color": "rgba(0, 0, 255, 0.4)"},   # 青
+    "sw_4way": {"name": "③ 4路スイッチ", "color": "rgba(0, 128, 0, 0.4)"},   # 緑
+    "outlet": {"name": "④ コンセント類", "color": "rgba(255, 165, 0, 0.4)"}, # オレンジ
+    "tv_lan": {"name": "⑤ TV/LAN/TEL", "color": "rgba(128, 0, 128, 0.4)"},   # 紫
+}
+
+# 拾い出し分類 → 見積の部材キー (ITEMS_DB)。1分類 = 1部材で、1連(基本)として計算する。
+PICKUP_TO_ITEM = {
+    "sw_b": "sw_b_mech",
+    "sw_3way": "sw_3_mech",
+    "sw_4way": "sw_4_mech",
+    "outlet": "outlet_w",
+    "tv_lan": "tv_4k",
+}
+
+def unpriced_pickups(counts, items):
+    """個数があるのに、価格マスタ (items) に対応する部材がない拾い出し分類のキー。"""
+    return [k for k, v in counts.items() if int(v) > 0 and PICKUP_TO_ITEM[k] not in items]
+
+def counts_to_takeoff(counts, room="図面拾い出し"):
+    """拾い出しの個数を拾い表 (takeoff_import 形式) に変換する。"""
+    import pandas as pd
+    rows = [{"room": room, "item": PICKUP_TO_ITEM[k], "layout": "", "name": "0", "qty": str(int(v))}
+            for k, v in counts.items() if int(v) > 0]
+    return pd.DataFrame(rows, columns=TAKEOFF_COLUMNS).fillna("")
+
+# ==========================================
+# マーカー座標（ズームに依存しない図面座標）
+# ==========================================
+# マーカーは図面の幅・高さに対する 0〜1 の位置で保持し、表示時に現在のキャンバスサイズへ投影する。
+# 半径と線幅は画面上の大きさなのでズームしても変えない。
+def _center(obj):
+    r = obj.get("radius", 0) * obj.get("scaleX", 1) + obj.get("strokeWidth", 0) / 2
+    cx = obj.get("left", 0) + (r if obj.get("originX", "left") == "left" else 0)
+    cy = obj.get("top", 0) + (r if obj.get("originY", "top") == "top" else 0)
+    return cx, cy
+
+def objects_to_markers(objects, canvas_width, canvas_height):
+    markers = []
+    for obj in objects:
+        cx, cy = _center(obj)
+        markers.append({"x": cx / canvas_width, "y": cy / canvas_height, "fill": obj.get("fill"),
+                        "stroke": obj.get("stroke"), "radius": obj.get("radius", 3), "strokeWidth": obj.get("strokeWidth", 0)})
+    return markers
+
+def markers_to_drawing(markers, canvas_width, canvas_height, revision=0):
+    """st_canvas の initial_drawing に渡す fabric.js 形式へ投影する。
+
+    キャンバスは前回読み込んだ内容と同じ initial_drawing を無視するので、マーカーを画面外で
+    書き換えたときは revision を変えて必ず読み直させる。
+    """
+    objects = []
+    for m in markers:
+        r = m["radius"] + m["strokeWidth"] / 2
+        objects.append({"type": "circle", "originX": "left", "originY": "center",
+                        "left": m["x"] * canvas_width - r, "top": m["y"] * canvas_height,
+                        "radius": m["radius"], "strokeWidth": m["strokeWidth"], "fill": m["fill"], "stroke": m["stroke"],
+                        "selectable": False, "evented": False})
+    return {"version": "4.4.0", "objects": objects, "revision": revision}
+
+# ==========================================
+# 自動検出の仮置きマーカー
+# ==========================================
+# 検出結果は分類色の塗り + 黒い細枠で置き、手で打ったマーカーと見分けられるようにする。
+# 誤検出は「消しゴム」色の点をその上に打つと取り除ける。
+AUTO_STROKE = "rgba(0, 0, 0, 0.7)"
+AUTO_STROKE_WIDTH = 2
+ERASE_COLOR = "rgba(255, 255, 255, 0.9)"
+# 形だけでは分類が決まらない検出 (● は片切にも、数字を傍記した3路・4路にもなる) は灰色で置き、
+# どの分類にも数えない。人が傍記を見て、消しゴムで消してから正しい分類で打ち直す。
+REVIEW_KEY = "review"
+REVIEW_COLOR = "rgba(128, 128, 128, 0.5)"
+
+def detections_to_markers(detections, markers, canvas_width, canvas_height, radius, pickup_items=PICKUP_ITEMS):
+    """検出結果 (分類キー, x, y, score) を仮置きマーカーにして markers に足す。
+
+    以前の仮置きは置き換え、手で打ったマーカーの近く (radius 以内) の検出は捨てる。
+    """
+    manual = [m for m in markers if m["stroke"] != AUTO_STROKE]
+    r2 = (2 * radius) ** 2
+    added = []
+    for key, x, y, _ in detections:
+        if any(((x - m["x"]) * canvas_width) ** 2 + ((y - m["y"]) * canvas_height) ** 2 <= r2 for m in manual): continue
+        fill = REVIEW_COLOR if key == REVIEW_KEY else pickup_items[key]["color"]
+        added.append({"x": x, "y": y, "fill": fill, "stroke": AUTO_STROKE,
+                      "radius": radius, "strokeWidth": AUTO_STROKE_WIDTH})
+    return manual + added
+
+# ==========================================
+# マーカーの増分集計
+# ==========================================
+def _fingerprint(obj, canvas_width, canvas_height):
+    cx, cy = _center(obj)
+    return round(cx / canvas_width, 4), round(cy / canvas_height, 4), obj.get("fill")
+
+class MarkerTally:
+    """キャンバスの objects と同期しながら、分類ごとの個数をその場で更新する。
+
+    点モードのキャンバスは末尾への追加 (クリック) と末尾からの削除 (元に戻す) しか起きないので、
+    前回との境目の1点だけを照合し、増減した分だけを処理する。照合できなければ全件を数え直す。
+    消しゴムの点や自動検出の仮置きでマーカーを画面外で書き換えたときは revision を進め、
+    キャンバスが読み直して一致するまで届いた値を使わない (stale)。
+    """
+
+    def __init__(self, pickup_items=PICKUP_ITEMS):
+        self.color_to_key = {info["color"]: k for k, info in pickup_items.items()}
+        self.reset()
+
+    def reset(self, markers=()):
+        self.counts = {k: 0 for k in self.color_to_key.values()}
+        self.markers = []
+        self._fps = []
+        self.size = None
+        self.revision = getattr(self, "revision", 0)
+        self.stale = False
+        for m in markers: self._add_marker(m)
+
+    def replace(self, markers):
+        """マーカーを丸ごと差し替え、キャンバスに読み直させる。"""
+        size = self.size
+        self.reset(markers)
+        self.size = size
+        self.revision += 1; self.stale = True
+
+    @property
+    def pending(self):
+        """未確認の仮置きマーカー数 (要確認を含む)。"""
+        return sum(m["stroke"] == AUTO_STROKE for m in self.markers)
+
+    @property
+    def needs_review(self):
+        """分類が決まらず数えていない仮置きマーカー数。"""
+        return sum(m["fill"] == REVIEW_COLOR for m in self.markers)
+
+    def confirm(self):
+        """仮置きを確定マーカー (手打ちと同じ見た目) にする。要確認のマーカーは仮置きのまま残す。"""
+        self.replace([dict(m, stroke=m["fill"]) if m["stroke"] == AUTO_STROKE and m["fill"] != REVIEW_COLOR else m
+                      for m in self.markers])
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def _add_marker(self, m):
+        self.markers.append(m)
+        self._fps.append((round(m["x"], 4), round(m["y"], 4), m["fill"]))
+        key = self.color_to_key.get(m["fill"])
+        if key is not None: self.counts[key] += 1
+
+    def _truncate(self, n):
+        for m in self.markers[n:]:
+            key = self.color_to_key.get(m["fill"])
+            if key is not None: self.counts[key] -= 1
+        del self.markers[n:]; del self._fps[n:]
+
+    def _erase_near(self, point, canvas_width, canvas_height):
+        best, best_d2 = None, None
+        for i, m in enumerate(self.markers):
+            d2 = ((m["x"] - point["x"]) * canvas_width) ** 2 + ((m["y"] - point["y"]) * canvas_height) ** 2
+            if d2 <= max(m["radius"] + m["strokeWidth"] / 2, 10) ** 2 and (best is None or d2 < best_d2): best, best_d2 = i, d2
+        if best is not None:
+            key = self.color_to_key.get(self.markers[best]["fill"])
+            if key is not None: self.counts[key] -= 1
+            del self.markers[best]; del self._fps[best]
+        self.revision += 1; self.stale = True
+
+    def _ingest(self, markers, canvas_width, canvas_height):
+        for m in markers:
+            if m["fill"] == ERASE_COLOR: self._erase_near(m, canvas_width, canvas_height)
+            else: self._add_marker(m)
+
+    def sync(self, objects, canvas_width, canvas_height):
+        n = len(self.markers)
+        if self.stale:
+            # 書き換えたマーカーをキャンバスが読み直すまでは、古い内容が届いても取り込まない
+            if len(objects) != n or (n and _fingerprint(objects[-1], canvas_width, canvas_height) != self._fps[-1]): return
+            self.stale = False
+        k = min(n, len(objects))
+        if k and _fingerprint(objects[k - 1], canvas_width, canvas_height) != self._fps[k - 1]:
+            if self.size and _fingerprint(objects[k - 1], *self.size) == self._fps[k - 1]:
+                return  # ズーム前のキャンバスの値がまだ届いているだけ
+            self.reset()
+            self._ingest(objects_to_markers(objects, canvas_width, canvas_height), canvas_width, canvas_height)
+        elif len(objects) > n:
+            self._ingest(objects_to_markers(objects[n:], canvas_width, canvas_height), canvas_width, canvas_height)
+        elif len(objects) < n:
+            self._truncate(len(objects))
+        self.size = (canvas_width, canvas_height)
@@ -0,0 +1,243 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from pricing import (SERIES_NAMES, ITEMS_DB, HANDLE_PRICES_SINGLE, PLATE_PRICES_1, FRAME_PRICES,
+                     COLOR_TYPES, PriceTables)
+
+# ==========================================
+# 1. カタログ形式
+# ==========================================
+# 1行1レコードの縦持ち形式。table 列で種類を分ける。
+#   series : key=シリーズキー, label=表示名
+#   item   : key=部材キー, label=品名, icon, img_file, has_lamp
+#   body   : key=部材キー, series, price
+#   frame  : series, price
+#   plate  : series, color, price
+#   handle : series, color, window, name, price
+CATALOG_COLUMNS = ["table", "key", "series", "color", "window", "name", "label", "icon", "img_file", "has_lamp", "price"]
+CATALOG_TABLES = ("series", "item", "body", "frame", "plate", "handle")
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "masters", "price_master.csv")
+SNAPSHOT_ARRAYS = ("body", "frame", "plate", "handle", "adder", "no_handle", "is_outlet")
+
+def builtin_catalog():
+    import pandas as pd
+    rows = []
+    for k, label in SERIES_NAMES.items():
+        rows.append({"table": "series", "key": k, "label": label})
+    for k, item in ITEMS_DB.items():
+        rows.append({"table": "item", "key": k, "label": item["name"], "icon": item["icon"],
+                     "img_file": item["img_file"], "has_lamp": item["has_lamp"]})
+    for k, item in ITEMS_DB.items():
+        for s in SERIES_NAMES:
+            if s in item: rows.append({"table": "body", "key": k, "series": s, "price": item[s]})
+    for s, price in FRAME_PRICES.items():
+        rows.append({"table": "frame", "series": s, "price": price})
+    for (s, c), price in PLATE_PRICES_1.items():
+        rows.append({"table": "plate", "series": s, "color": c, "price": price})
+    for (s, c), prices in HANDLE_PRICES_SINGLE.items():
+        if s not in SERIES_NAMES: continue  # "other" はどのシリーズからも参照されない
+        for (w, n), price in prices.items():
+            rows.append({"table": "handle", "series": s, "color": c, "window": w, "name": n, "price": price})
+    df = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+    df["price"] = df["price"].astype("Int64")  # 人が編集するファイルなので "250.0" ではなく "250" で書き出す
+    return df
+
+def export_catalog(path, df=None):
+    df = builtin_catalog() if df is None else df
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.lower().endswith((".xlsx", ".xlsm")): df.to_excel(path, index=False, engine="openpyxl")
+    else: df.to_csv(path, index=False, encoding="utf-8-sig")
+
+def read_catalog(path):
+    import pandas as pd
+    try:
+        if path.lower().endswith((".xlsx", ".xlsm")):
+            df = pd.read_excel(path, dtype=str, keep_default_na=False, engine="openpyxl")
+        else:
+            df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    except (ValueError, OSError):
+        raise
+    except Exception as e:  # 保存途中・壊れた xlsx など (zipfile.BadZipFile 等)
+        raise ValueError(f"価格マスタを読み込めませんでした ({type(e).__name__}: {e})") from e
+    for c in CATALOG_COLUMNS:
+        if c not in df.columns: df[c] = ""
+    return df[CATALOG_COLUMNS].apply(lambda col: col.str.strip())
+
+# ==========================================
+# 2. 検証とコンパイル
+# ==========================================
+_TRUE = {"true", "1", "yes", "y", "○"}
+_FALSE = {"false", "0", "no", "n", "", "×"}
+
+def _as_bool(value, where, errors):
+    v = str(value).strip().lower()
+    if v in _TRUE: return True
+    if v not in _FALSE: errors.append(f"{where}: 真偽値ではありません ({value})")
+    return False
+
+def _as_price(value, where, errors):
+    try:
+        f = float(value)
+    except ValueError:
+        errors.append(f"{where}: 価格が数値ではありません ({value})"); return 0
+    if not math.isfinite(f) or f != int(f) or f < 0:
+        errors.append(f"{where}: 価格は0以上の整数で指定してください ({value})"); return 0
+    return int(f)
+
+def compile_catalog(df):
+    """カタログを検証して PriceTables に変換する。問題があればまとめて ValueError にする。"""
+    errors = []
+    bad = sorted(set(df["table"]) - set(CATALOG_TABLES))
+    if bad: errors.append(f"table 列に不明な値があります: {bad}")
+    dup = df[df.duplicated(["table", "key", "series", "color", "window", "name"], keep=False)]
+    for r in dup.itertuples(): errors.append(f"{r.Index + 2}行目: 重複した定義です")
+
+    series_names = {r.key: r.label for r in df[df["table"] == "series"].itertuples()}
+    if not series_names: errors.append("series が1件もありません")
+    items_db = {}
+    for r in df[df["table"] == "item"].itertuples():
+        where = f"{r.Index + 2}行目"
+        if not r.key or not r.label: errors.append(f"{where}: item には key と label が必要です")
+        items_db[r.key] = {"name": r.label, "icon": r.icon, "img_file": r.img_file,
+                           "has_lamp": _as_bool(r.has_lamp, where, errors)}
+    if not items_db: errors.append("item が1件もありません")
+
+    handle_prices, plate_prices, frame_prices = {}, {}, {}
+    for r in df[df["table"].isin(["body", "frame", "plate", "handle"])].itertuples():
+        where = f"{r.Index + 2}行目({r.table})"
+        if r.series not in series_names: errors.append(f"{where}: 未定義のシリーズです ({r.series})"); continue
+        price = _as_price(r.price, where, errors)
+        if r.table == "body":
+            if r.key not in items_db: errors.append(f"{where}: 未定義の部材です ({r.key})"); continue
+            items_db[r.key][r.series] = price
+        elif r.table == "frame":
+            frame_prices[r.series] = price
+        else:
+            color = r.color or "std"
+            if color not in COLOR_TYPES: errors.append(f"{where}: 色は {COLOR_TYPES} のいずれかです ({r.color})"); continue
+            if r.table == "plate":
+                plate_prices[(r.series, color)] = price
+            else:
+                h_key = (_as_bool(r.window, where, errors), _as_bool(r.name, where, errors))
+                handle_prices.setdefault((r.series, color), {})[h_key] = price
+
+    if errors: raise ValueError("価格マスタに問題があります:\n" + "\n".join(errors))
+    return PriceTables.from_masters(items_db, handle_prices, plate_prices, frame_prices, series_names)
+
+# ==========================================
+# 3. コンパイル済みスナップショット（内容ハッシュで管理）
+# ==========================================
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    return h.hexdigest()
+
+# 同じフォルダの別のカタログとは共有しないよう、ファイル名とハッシュの両方で分ける
+def snapshot_dir(catalog_path, digest):
+    catalog_path = os.path.abspath(catalog_path)
+    return os.path.join(os.path.dirname(catalog_path), ".price_cache", f"{os.path.basename(catalog_path)}-{digest[:16]}")
+
+def write_snapshot(tables, path):
+    tmp = path + f".tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for name in SNAPSHOT_ARRAYS: np.save(os.path.join(tmp, name + ".npy"), getattr(tables, name))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"series_names": tables.series_names, "items": tables.items}, f, ensure_ascii=False)
+    try:
+        os.replace(tmp, path)
+    except OSError:  # 他のワーカーが先に書いた
+        shutil.rmtree(tmp, ignore_errors=True)
+    # 同じカタログの古いスナップショットを掃除 (他のカタログのものと作成途中のものは残す)
+    root, name = os.path.split(path)
+    catalog_name = name.rpartition("-")[0]
+    for d in os.listdir(root):
+        stem, _, tail = d.rpartition("-")
+        if d != name and stem == catalog_name and ".tmp" not in tail: shutil.rmtree(os.path.join(root, d), ignore_errors=True)
+
+def read_snapshot(path):
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in SNAPSHOT_ARRAYS}
+    return PriceTables(meta["series_names"], meta["items"], **arrays)
+
+def load_tables(catalog_path):
+    digest = file_digest(catalog_path)
+    snap = snapshot_dir(catalog_path, digest)
+    if os.path.isdir(snap): return read_snapshot(snap), digest
+    tables = compile_catalog(read_catalog(catalog_path))
+    write_snapshot(tables, snap)
+    return tables, digest
+
+class PriceMaster:
+    """カタログの更新 (mtime→ハッシュ) を検知して自動で読み直す価格マスタ。
+
+    カタログが無い場合は pricing.py 組み込みのマスタを使う。
+    編集したカタログに問題があるときは例外にせず、前回読めたマスタ (無ければ組み込み) を使い続け、
+    問題の内容を error に残す。ファイルが直れば次の get() で読み直す。
+    """
+
+    def __init__(self, catalog_path=None):
+        self.catalog_path = catalog_path or os.environ.get("PRICE_MASTER_PATH", DEFAULT_CATALOG)
+        self._lock = threading.Lock()
+        self._stat = None
+        self._digest = None
+        self._tables = None
+        self.error = None
+
+    def get(self):
+        try:
+            st_ = os.stat(self.catalog_path)
+            stat = (st_.st_mtime_ns, st_.st_size)
+        except FileNotFoundError:
+            stat = None
+        if self._tables is not None and stat == self._stat: return self._tables
+        with self._lock:
+            if self._tables is not None and stat == self._stat: return self._tables
+            self.error = None
+            if stat is None:
+                self._tables, self._digest = PriceTables.from_masters(), None
+            elif file_digest(self.catalog_path) != self._digest or self._tables is None:
+                try:
+                    self._tables, self._digest = load_tables(self.catalog_path)
+                except (ValueError, OSError) as e:
+                    if self._tables is None: self._tables, self._digest = PriceTables.from_masters(), None
+                    self.error = str(e)
+            self._stat = stat
+            return self._tables
+
+    @property
+    def version(self):
+        return self._digest[:12] if self._digest else "builtin"
+
+def load_catalog_tables(catalog_path=None):
+    """一括処理用。指定したカタログは組み込みに逃げずに読み、問題があれば ValueError/OSError にする。
+
+    未指定なら画面と同じ既定のカタログ (無ければ組み込み) を使う。
+    """
+    if catalog_path: return load_tables(catalog_path)[0]
+    price_master = PriceMaster()
+    tables = price_master.get()
+    if price_master.error: raise ValueError(price_master.error)
+    return tables
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="価格マスタのエクスポート／コンパイル")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_exp = sub.add_parser("export", help="組み込みマスタをカタログ(CSV/XLSX)に書き出す")
+    p_exp.add_argument("path", nargs="?", default=DEFAULT_CATALOG)
+    p_cmp = sub.add_parser("compile", help="カタログを検証してスナップショットを作る")
+    p_cmp.add_argument("path", nargs="?", default=DEFAULT_CATALOG)
+    args = parser.parse_args()
+    if args.cmd == "export":
+        export_catalog(args.path); print(f"書き出しました: {args.path}")
+    else:
+        tables, digest = load_tables(args.path)
+        print(f"OK: {len(tables.series_keys)} シリーズ / {len(tables.item_keys)} 部材 -> {snapshot_dir(args.path, digest)}")
@@ -0,0 +1,344 @@
+import functools
+import hashlib
+import json
+
+import numpy as np
+
+# ==========================================
+# 1. データベース定義
+# ==========================================
+
+# シリーズ定義
+SERIES_NAMES = {
+    "fullcolor": "Panasonic フルカラー(モダン)",
+    "cosmo": "Panasonic コスモワイド21",
+    "advance": "Panasonic アドバンス",
+    "adv_metal": "Panasonic アドバンス(新金属)",
+    "select": "Panasonic セレクトプレート",
+    "sostyle": "Panasonic SO-STYLE",
+    "classic": "Panasonic クラシック",
+    "extra": "Panasonic エクストラ",
+    "jimbo": "JIMBO NKシリーズ"
+}
+
+# ▼ ハンドル単価マスタ
+HANDLE_PRICES_SINGLE = {
+    ("cosmo", "std"):   {(False, False): 115, (False, True): 185, (True, False): 185, (True, True): 255},
+    ("advance", "std"): {(False, False): 230, (False, True): 300, (True, False): 300, (True, True): 370},
+    ("advance", "black"):{(False, False): 330, (False, True): 400, (True, False): 400, (True, True): 440},
+    ("fullcolor", "std"):{(False, False): 0, (False, True): 20, (True, False): 50, (True, True): 70},
+    ("sostyle", "std"):  {(False, False): 450, (False, True): 450, (True, False): 450, (True, True): 450},
+    ("sostyle", "black"):{(False, False): 450, (False, True): 450, (True, False): 450, (True, True): 450},
+    ("other", "std"):    {(False, False): 0, (False, True): 0, (True, False): 0, (True, True): 0},
+}
+
+# ▼ プレート単価マスタ (1連)
+PLATE_PRICES_1 = {
+    ("cosmo", "std"): 170,     ("advance", "std"): 330,   ("advance", "black"): 430,
+    ("sostyle", "std"): 900,   ("sostyle", "black"): 900, ("fullcolor", "std"): 220,
+    ("jimbo", "std"): 600,
+}
+
+# ▼ 部材マスタ
+ITEMS_DB = {
+    "sw_b_mech": {"name": "片切スイッチ", "icon": "🔘", "img_file": "sw_b.jpg", "has_lamp": False,
+                  "fullcolor": 250, "cosmo": 250, "advance": 250, "sostyle": 900, "jimbo": 1800},
+    "sw_h_mech": {"name": "ほたるスイッチ", "icon": "🟢", "img_file": "sw_b.jpg", "has_lamp": True,
+                  "fullcolor": 630, "cosmo": 550, "advance": 550, "sostyle": 1970, "jimbo": 2900},
+    "sw_3_mech": {"name": "3路スイッチ", "icon": "🔄", "img_file": "sw_3.jpg", "has_lamp": False,
+                  "fullcolor": 430, "cosmo": 420, "advance": 420, "sostyle": 1500, "jimbo": 2200},
+    "sw_3h_mech": {"name": "3路ほたるSW", "icon": "🔄🟢", "img_file": "sw_3.jpg", "has_lamp": True,
+                   "fullcolor": 850, "cosmo": 760, "advance": 700, "sostyle": 2900, "jimbo": 3300},
+    "sw_4_mech": {"name": "4路スイッチ", "icon": "🔀", "img_file": "sw_4.jpg", "has_lamp": False,
+                  "fullcolor": 1600, "cosmo": 1600, "advance": 1600, "sostyle": 3500, "jimbo": 3200},
+    "sw_4h_mech": {"name": "4路ほたるSW", "icon": "🔀🟢", "img_file": "sw_4.jpg", "has_lamp": True,
+                   "fullcolor": 2100, "cosmo": 1800, "advance": 1600, "sostyle": 5300, "jimbo": 4200},
+    "outlet_w": {"name": "ダブルコンセント", "icon": "🔌", "img_file": "outlet_w.jpg", "has_lamp": False,
+                 "fullcolor": 380, "cosmo": 550, "advance": 800, "sostyle": 1200, "jimbo": 1300},
+    "outlet_e": {"name": "アース付コンセント", "icon": "⏚", "img_file": "outlet_e.jpg", "has_lamp": False,
+                 "fullcolor": 450, "cosmo": 600, "advance": 900, "sostyle": 1300, "jimbo": 1500},
+    "tv_4k": {"name": "TV端子(4K8K)", "icon": "📺", "img_file": "tv_4k.jpg", "has_lamp": False,
+              "fullcolor": 1400, "cosmo": 1400, "advance": 1700, "sostyle": 2100, "jimbo": 2300},
+    "lan_6": {"name": "LAN(CAT6)", "icon": "💻", "img_file": "lan_6.jpg", "has_lamp": False,
+              "fullcolor": 2090, "cosmo": 2090, "advance": 2500, "sostyle": 3500, "jimbo": 3200},
+}
+
+FRAME_PRICES = {"fullcolor": 60, "cosmo": 70, "advance": 70, "sostyle": 150, "jimbo": 100}
+
+COLOR_TYPES = ("std", "black")
+HANDLE_TYPES = ("single", "double", "triple")
+# 多連ハンドルの加算額 (コスモ, その他)
+HANDLE_ADDERS = {"single": (0, 0), "double": (110, 320), "triple": (220, 640)}
+ITEM_META_KEYS = ("name", "icon", "img_file", "has_lamp")
+
+# ==========================================
+# 2. 単体計算ロジック（1件ずつ）
+# ==========================================
+def get_db_price(db, series_key, color_type, *args):
+    if (series_key, color_type) in db: val = db[(series_key, color_type)]
+    elif (series_key, "std") in db: val = db[(series_key, "std")]
+    else: return db.get(series_key, 0)
+    if args and isinstance(val, dict): return val.get(args[0], 0)
+    return val
+
+def has_no_handle(item_key):
+    return "outlet" in item_key or "tv" in item_key or "lan" in item_key
+
+def handle_adder(series_key, handle_type):
+    cosmo_add, other_add = HANDLE_ADDERS.get(handle_type, (0, 0))
+    return cosmo_add if series_key == "cosmo" else other_add
+
+def calculate_single_unit(item_key, src_series, tgt_series, tgt_color, needs_window, needs_name, handle_type="single"):
+    item = ITEMS_DB[item_key]
+    p_body_src = item.get(src_series, 0)
+    p_body_tgt = item.get(tgt_series, 0)
+    p_frame_src = FRAME_PRICES.get(src_series, 0)
+    p_frame_tgt = FRAME_PRICES.get(tgt_series, 0)
+    p_plate_src = get_db_price(PLATE_PRICES_1, src_series, "std")
+    p_plate_tgt = get_db_price(PLATE_PRICES_1, tgt_series, tgt_color)
+
+    if has_no_handle(item_key):
+        p_handle_src = 0; p_handle_tgt = 0
+    else:
+        h_key = (needs_window, needs_name)
+        p_handle_src = get_db_price(HANDLE_PRICES_SINGLE, src_series, "std", h_key) + handle_adder(src_series, handle_type)
+        p_handle_tgt = get_db_price(HANDLE_PRICES_SINGLE, tgt_series, tgt_color, h_key) + handle_adder(tgt_series, handle_type)
+
+    total_src = p_body_src + p_frame_src + p_plate_src + p_handle_src
+    total_tgt = p_body_tgt + p_frame_tgt + p_plate_tgt + p_handle_tgt
+    return total_tgt - total_src
+
+def plate_factor(cols_num, tgt_series):
+    if tgt_series == "cosmo": return cols_num * 1.5
+    return 1.0 if cols_num == 1 else (1.8 if cols_num == 2 else 2.6)
+
+def calculate_multi_gang(column_configs, src_series, tgt_series, tgt_color):
+    """多連プレート1セットあたりの差額。column_configs は {"items", "handle", "is_name"} のリスト。"""
+    p_unit_src = get_db_price(PLATE_PRICES_1, src_series, "std")
+    p_unit_tgt = get_db_price(PLATE_PRICES_1, tgt_series, tgt_color)
+    total_unit_diff = (p_unit_tgt - p_unit_src) * plate_factor(len(column_configs), tgt_series)
+    for config in column_configs:
+        d_body = sum([ITEMS_DB[itm].get(tgt_series, 0) - ITEMS_DB[itm].get(src_series, 0) for itm in config['items']])
+        if "outlet" in str(column_configs[0]['items'][0]) or "コンセント" in str(config['handle']): d_handle = 0
+        else:
+            needs_window = any(ITEMS_DB[itm].get("has_lamp", False) for itm in config['items'])
+            h_key = (needs_window, config['is_name'])
+            p_h_src = get_db_price(HANDLE_PRICES_SINGLE, src_series, "std", h_key)
+            p_h_tgt = get_db_price(HANDLE_PRICES_SINGLE, tgt_series, tgt_color, h_key)
+            d_handle = p_h_tgt - p_h_src
+        d_frame = FRAME_PRICES.get(tgt_series, 0) - FRAME_PRICES.get(src_series, 0)
+        total_unit_diff += (d_body + d_handle + d_frame)
+    return total_unit_diff
+
+# ==========================================
+# 3. ベクトル計算用テーブル（まとめて計算）
+# ==========================================
+BATCH_COLUMNS = ["item", "src", "tgt", "color", "window", "name", "handle", "qty"]
+
+def _codes(values, keys, column):
+    import pandas as pd
+    codes = pd.Categorical(values, categories=list(keys)).codes.astype(np.intp)
+    if (codes < 0).any():
+        unknown = sorted(set(np.asarray(values, dtype=object)[codes < 0].astype(str)))
+        raise ValueError(f"{column}: 未登録のキーがあります {unknown}")
+    return codes
+
+class PriceTables:
+    """マスタを密な配列に展開したもの。キーはすべて整数インデックスで引く。
+
+    body[item, series] / frame[series] / plate[series, color] /
+    handle[series, color, window, name] / adder[series, handle_type]
+    """
+
+    def __init__(self, series_names, items, body, frame, plate, handle, adder, no_handle, is_outlet):
+        self.series_names = dict(series_names)
+        self.series_keys = list(self.series_names)
+        self.items = {k: dict(v) for k, v in items.items()}
+        self.item_keys = list(self.items)
+        self.body = np.asarray(body, dtype=np.int64)
+        self.frame = np.asarray(frame, dtype=np.int64)
+        self.plate = np.asarray(plate, dtype=np.int64)
+        self.handle = np.asarray(handle, dtype=np.int64)
+        self.adder = np.asarray(adder, dtype=np.int64)
+        self.no_handle = np.asarray(no_handle, dtype=bool)
+        self.is_outlet = np.asarray(is_outlet, dtype=bool)
+        self.has_lamp = np.array([bool(self.items[k].get("has_lamp", False)) for k in self.item_keys], dtype=bool)
+        self.series_index = {k: i for i, k in enumerate(self.series_keys)}
+        self.item_index = {k: i for i, k in enumerate(self.item_keys)}
+        self.color_index = {k: i for i, k in enumerate(COLOR_TYPES)}
+        self.handle_index = {k: i for i, k in enumerate(HANDLE_TYPES)}
+        self.fingerprint = self._fingerprint()
+
+    def _fingerprint(self):
+        h = hashlib.sha1()
+        h.update(json.dumps([self.series_names, self.items], ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        for arr in (self.body, self.frame, self.plate, self.handle, self.adder, self.no_handle, self.is_outlet):
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+    @classmethod
+    def from_masters(cls, items_db=ITEMS_DB, handle_prices=HANDLE_PRICES_SINGLE, plate_prices=PLATE_PRICES_1,
+                     frame_prices=FRAME_PRICES, series_names=SERIES_NAMES):
+        series_keys = list(series_names)
+        item_keys = list(items_db)
+        body = [[items_db[i].get(s, 0) for s in series_keys] for i in item_keys]
+        frame = [frame_prices.get(s, 0) for s in series_keys]
+        plate = [[get_db_price(plate_prices, s, c) for c in COLOR_TYPES] for s in series_keys]
+        handle = [[[[get_db_price(handle_prices, s, c, (w, n)) for n in (False, True)] for w in (False, True)]
+                   for c in COLOR_TYPES] for s in series_keys]
+        adder = [[handle_adder(s, h) for h in HANDLE_TYPES] for s in series_keys]
+        items = {k: {m: items_db[k][m] for m in ITEM_META_KEYS if m in items_db[k]} for k in item_keys}
+        return cls(series_names, items, body, frame, plate, handle, adder,
+                   [has_no_handle(k) for k in item_keys], ["outlet" in k for k in item_keys])
+
+    def unit_diff(self, item, src, tgt, color, window, name, handle):
+        """整数インデックス配列を受け取り、1連単体の差額をまとめて返す（calculate_single_unit と同値）。"""
+        d_body = self.body[item, tgt] - self.body[item, src]
+        d_frame = self.frame[tgt] - self.frame[src]
+        d_plate = self.plate[tgt, color] - self.plate[src, 0]
+        d_handle = (self.handle[tgt, color, window, name] + self.adder[tgt, handle]
+                    - self.handle[src, 0, window, name] - self.adder[src, handle])
+        return d_body + d_frame + d_plate + np.where(self.no_handle[item], 0, d_handle)
+
+    def price_batch(self, df):
+        """BATCH_COLUMNS を持つ DataFrame を一括計算し、unit_diff / total_diff 列を付けて返す。"""
+        missing = [c for c in BATCH_COLUMNS if c not in df.columns]
+        if missing: raise ValueError(f"列が不足しています: {missing}")
+        unit = self.unit_diff(
+            _codes(df["item"], self.item_keys, "item"),
+            _codes(df["src"], self.series_keys, "src"),
+            _codes(df["tgt"], self.series_keys, "tgt"),
+            _codes(df["color"], COLOR_TYPES, "color"),
+            df["window"].to_numpy(dtype=bool).astype(np.intp),
+            df["name"].to_numpy(dtype=bool).astype(np.intp),
+            _codes(df["handle"], HANDLE_TYPES, "handle"),
+        )
+        out = df.copy()
+        out["unit_diff"] = unit
+        out["total_diff"] = unit * df["qty"].to_numpy(dtype=np.int64)
+        return out
+
+    def multi_gang(self, column_configs, src_series, tgt_series, tgt_color):
+        """calculate_multi_gang と同値の多連計算（テーブル参照版）。"""
+        s = self.series_index[src_series]; t = self.series_index[tgt_series]; c = self.color_index.get(tgt_color, 0)
+        total = int(self.plate[t, c] - self.plate[s, 0]) * plate_factor(len(column_configs), tgt_series)
+        skip_handle = bool(self.is_outlet[self.item_index[column_configs[0]['items'][0]]])
+        d_frame = self.frame[t] - self.frame[s]
+        for config in column_configs:
+            idx = [self.item_index[itm] for itm in config['items']]
+            d_body = int(self.body[idx, t].sum() - self.body[idx, s].sum())
+            if skip_handle: d_handle = 0
+            else:
+                w = int(self.has_lamp[idx].any()); n = int(bool(config['is_name']))
+                d_handle = int(self.handle[t, c, w, n] - self.handle[s, 0, w, n])
+            total += d_body + d_handle + int(d_frame)
+        return total
+
+# ==========================================
+# 4. 全組み合わせ差額表（起動時に1回だけ作る）
+# ==========================================
+def unit_spec(item_key, needs_window, needs_name, handle_type="single"):
+    return json.dumps({"item": item_key, "window": bool(needs_window), "name": bool(needs_name), "handle": handle_type},
+                      sort_keys=True, separators=(",", ":"))
+
+def gang_spec(column_configs):
+    cols = [{"items": list(c['items']), "handle": c['handle'], "is_name": bool(c['is_name'])} for c in column_configs]
+    return json.dumps({"cols": cols}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+@functools.lru_cache(maxsize=4096)
+def parse_spec(spec):
+    d = json.loads(spec)
+    if "cols" in d:
+        return "gang", tuple((tuple(c['items']), c['handle'], c['is_name']) for c in d['cols'])
+    return "unit", (d['item'], d['window'], d['name'], d['handle'])
+
+class DiffTable:
+    """全入力パターンの差額を前計算した表。
+
+    unit[item, src, tgt, color, window, name, handle] に1連単体の差額を持ち、
+    多連ビルダー用には部品ごとの差額表 (本体/ハンドル/枠/プレート) を持つ。
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        t = tables
+        grid = np.ix_(np.arange(len(t.item_keys)), np.arange(len(t.series_keys)), np.arange(len(t.series_keys)),
+                      np.arange(len(COLOR_TYPES)), np.arange(2), np.arange(2), np.arange(len(HANDLE_TYPES)))
+        self.unit = t.unit_diff(*grid)
+        self.body = t.body[:, None, :] - t.body[:, :, None]                          # [item, src, tgt]
+        self.frame = t.frame[None, :] - t.frame[:, None]                             # [src, tgt]
+        self.plate = t.plate[None, :, :] - t.plate[:, None, 0, None]                 # [src, tgt, color]
+        self.handle = t.handle[None, :, :, :, :] - t.handle[:, None, 0, None, :, :]  # [src, tgt, color, window, name]
+        self.plate_factor = np.array([[plate_factor(n, g) for g in t.series_keys] for n in range(4)])  # [列数, tgt]
+        self.fingerprint = t.fingerprint
+        # 構成ごとの計算結果のメモ。表ごとに持つので、マスタを読み直せば古い表と一緒に捨てられる
+        self._spec_memo = {}
+        self._targets_memo = {}
+
+    def single(self, item_key, src_series, tgt_series, tgt_color, needs_window, needs_name, handle_type="single"):
+        t = self.tables
+        return int(self.unit[t.item_index[item_key], t.series_index[src_series], t.series_index[tgt_series],
+                             t.color_index.get(tgt_color, 0), int(bool(needs_window)), int(bool(needs_name)),
+                             t.handle_index[handle_type]])
+
+    def multi_gang(self, column_configs, src_series, tgt_series, tgt_color):
+        """calculate_multi_gang と同値。各列は表の参照と加算のみ。"""
+        t = self.tables
+        s = t.series_index[src_series]; g = t.series_index[tgt_series]; c = t.color_index.get(tgt_color, 0)
+        total = int(self.plate[s, g, c]) * plate_factor(len(column_configs), tgt_series)
+        skip_handle = bool(t.is_outlet[t.item_index[column_configs[0]['items'][0]]])
+        d_frame = int(self.frame[s, g])
+        for config in column_configs:
+            idx = [t.item_index[itm] for itm in config['items']]
+            d_body = int(self.body[idx, s, g].sum())
+            if skip_handle: d_handle = 0
+            else: d_handle = int(self.handle[s, g, c, int(t.has_lamp[idx].any()), int(bool(config['is_name']))])
+            total += d_body + d_handle + d_frame
+        return total
+
+    def spec_diff(self, spec, src_series, tgt_series, tgt_color):
+        key = (spec, src_series, tgt_series, tgt_color)
+        diff = self._spec_memo.get(key)
+        if diff is None:
+            kind, body = parse_spec(spec)
+            if kind == "unit": diff = self.single(body[0], src_series, tgt_series, tgt_color, body[1], body[2], body[3])
+            else: diff = self.multi_gang([{"items": list(items), "handle": h, "is_name": n} for items, h, n in body],
+                                         src_series, tgt_series, tgt_color)
+            self._spec_memo[key] = diff
+        return diff
+
+    def gang_targets(self, spec, src_series, tgt_color):
+        """多連構成 spec の差額を全変更先シリーズについてまとめて返す ([tgt] の配列、multi_gang と同値)。"""
+        key = (spec, src_series, tgt_color)
+        totals = self._targets_memo.get(key)
+        if totals is None:
+            t = self.tables
+            body = parse_spec(spec)[1]
+            s = t.series_index[src_series]; c = t.color_index.get(tgt_color, 0)
+            totals = self.plate[s, :, c] * self.plate_factor[len(body)]
+            skip_handle = bool(t.is_outlet[t.item_index[body[0][0][0]]])
+            for items, _, is_name in body:
+                idx = [t.item_index[itm] for itm in items]
+                totals = totals + self.body[idx, s, :].sum(axis=0) + self.frame[s, :]
+                if not skip_handle: totals = totals + self.handle[s, :, c, int(t.has_lamp[idx].any()), int(bool(is_name))]
+            self._targets_memo[key] = totals
+        return totals
+
+    def compare_targets(self, lines):
+        """見積行 (spec/src/color/qty 列を持つ DataFrame) を全変更先シリーズで計算し、シリーズ別の合計を返す。"""
+        t = self.tables
+        totals = np.zeros(len(t.series_keys), dtype=np.float64)
+        grouped = lines.groupby(["spec", "src", "color"], observed=True)["qty"].sum()
+        units, gangs = [], []
+        for (spec, src, color), qty in grouped.items():
+            kind, body = parse_spec(spec)
+            (units if kind == "unit" else gangs).append((spec, body, src, color, int(qty)))
+        if units:
+            i = np.array([t.item_index[b[0]] for _, b, _, _, _ in units]); w = np.array([int(b[1]) for _, b, _, _, _ in units])
+            n = np.array([int(b[2]) for _, b, _, _, _ in units]); h = np.array([t.handle_index[b[3]] for _, b, _, _, _ in units])
+            s = np.array([t.series_index[u[2]] for u in units]); c = np.array([t.color_index.get(u[3], 0) for u in units])
+            q = np.array([u[4] for u in units], dtype=np.int64)
+            totals += (self.unit[i, s, :, c, w, n, h] * q[:, None]).sum(axis=0)
+        for spec, _, src, color, qty in gangs:
+            totals += self.gang_targets(spec, src, color) * qty
+        return dict(zip(t.series_keys, totals.tolist()))
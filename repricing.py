@@ -0,0 +1,111 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pricing import COLOR_TYPES, DiffTable, parse_spec
+
+# ==========================================
+# 保存済み見積の一括再計算（what-if）
+# ==========================================
+# 全見積の行 (spec/src/tgt/color/qty) を、別の価格マスタや変更元/変更先/色で計算し直し、
+# 見積ごとに旧合計と新合計を並べる。行は (spec, src, tgt, color) の組にまとめてから計算するので、
+# 見積が数千件あっても計算するのは組の数だけ。1連は差額表を配列でまとめて引き、多連は spec_diff のメモを使う。
+REPORT_COLUMNS = ["job_id", "client_name", "hm_name", "src", "tgt", "color", "line_count", "old_total", "new_total",
+                  "change", "unpriced_lines"]
+REPORT_HEADERS = ["見積ID", "施主名", "HM名", "変更元", "変更先", "色", "行数", "旧合計", "新合計", "増減", "計算できない行"]
+
+def _combo_diff(combos, diff_table):
+    """(spec, src, tgt, color) の組ごとの単価差額。計算できない組 (未登録の部材・シリーズ) は NaN。"""
+    t = diff_table.tables
+    out = np.full(len(combos), np.nan)
+    ok = combos["src"].isin(t.series_keys) & combos["tgt"].isin(t.series_keys) & combos["color"].isin(COLOR_TYPES)
+    parsed = [parse_spec(s) if s else ("", None) for s in combos["spec"]]
+    is_unit = np.array([k == "unit" and b[0] in t.item_index for k, b in parsed], dtype=bool) & ok.to_numpy()
+    if is_unit.any():
+        body = [b for (k, b), u in zip(parsed, is_unit) if u]
+        u = combos[is_unit]
+        out[is_unit] = diff_table.unit[[t.item_index[b[0]] for b in body], [t.series_index[s] for s in u["src"]],
+                                       [t.series_index[s] for s in u["tgt"]], [t.color_index[c] for c in u["color"]],
+                                       [int(b[1]) for b in body], [int(b[2]) for b in body], [t.handle_index[b[3]] for b in body]]
+    for i, ((kind, body), spec, src, tgt, color) in enumerate(zip(parsed, combos["spec"], combos["src"], combos["tgt"], combos["color"])):
+        if kind != "gang" or not ok.iat[i]: continue
+        if all(itm in t.item_index for items, _, _ in body for itm in items):
+            out[i] = diff_table.spec_diff(spec, src, tgt, color)
+    return np.rint(out)
+
+def reprice(jobs, lines, diff_table, src=None, tgt=None, color=None):
+    """見積ごとの旧合計・新合計。src/tgt/color を指定すると全行をその設定に置き換えて計算する。
+
+    jobs, lines は EstimateDB.portfolio() の戻り値。計算できない行は旧金額のまま合計し、件数を数える。
+    """
+    lines = lines.copy()
+    for c, v in (("src", src), ("tgt", tgt), ("color", color)):
+        if v: lines[c] = v
+    keys = ["spec", "src", "tgt", "color"]
+    combos = lines[keys].drop_duplicates().reset_index(drop=True)
+    combos["unit_new"] = _combo_diff(combos, diff_table)
+    lines = lines.merge(combos, on=keys, how="left")
+    priced = lines["unit_new"].notna()
+    lines["new"] = np.where(priced, lines["unit_new"].fillna(0) * lines["qty"], lines["total_diff"]).astype(np.int64)
+    lines["unpriced"] = (~priced).astype(np.int64)
+    per_job = lines.groupby("job_id").agg(line_count=("qty", "size"), old_total=("total_diff", "sum"),
+                                          new_total=("new", "sum"), unpriced_lines=("unpriced", "sum"))
+    report = jobs[["id", "client_name", "hm_name", "src", "tgt", "color"]].set_index("id").join(per_job, how="left").fillna({"line_count": 0, "old_total": 0, "new_total": 0,
+                                                                     "unpriced_lines": 0})
+    for c, v in (("src", src), ("tgt", tgt), ("color", color)):
+        if v: report[c] = v
+    report = report.reset_index().rename(columns={"id": "job_id"})
+    for c in ("line_count", "old_total", "new_total", "unpriced_lines"): report[c] = report[c].astype(np.int64)
+    report["change"] = report["new_total"] - report["old_total"]
+    return report[REPORT_COLUMNS]
+
+# ==========================================
+# コマンドライン（シナリオごとに並列）
+# ==========================================
+def _run_scenario(db_path, catalog_path, src, tgt, color):
+    """(report, None) または (None, エラー内容)。読めない価格マスタを組み込みで代用して「増減なし」と答えない。"""
+    from estimate_db import EstimateDB
+    from price_master import load_catalog_tables
+    try:
+        diff_table = DiffTable(load_catalog_tables(catalog_path))
+    except (ValueError, OSError) as e:
+        return None, str(e)
+    db = EstimateDB(db_path)
+    try:
+        jobs, lines = db.portfolio()
+    finally:
+        db.close()
+    return reprice(jobs, lines, diff_table, src, tgt, color), None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="保存済みの全見積を別の価格マスタ・シリーズで計算し直し、旧/新合計を比べる")
+    parser.add_argument("--catalog", nargs="+", default=[None], help="価格マスタ (複数指定でシナリオごとに並列計算)")
+    parser.add_argument("--src", default=None, help="変更元シリーズを置き換える")
+    parser.add_argument("--tgt", default=None, help="変更先シリーズを置き換える")
+    parser.add_argument("--color", default=None, choices=COLOR_TYPES)
+    parser.add_argument("--db", default=None, help="見積DB (既定: data/estimates.db)")
+    parser.add_argument("--out", default=None, help="結果の CSV (シナリオが複数なら末尾に番号を付ける)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    scenarios = [(args.db, c, args.src, args.tgt, args.color) for c in args.catalog]
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(scenarios))) as pool:
+        results = list(pool.map(_run_scenario, *zip(*scenarios)))
+    failed = 0
+    for n, (catalog, (report, error)) in enumerate(zip(args.catalog, results)):
+        if error is not None:
+            print(f"[{catalog or '現在の価格マスタ'}] NG  {error}", file=sys.stderr); failed += 1; continue
+        print(f"[{catalog or '現在の価格マスタ'}] {len(report)} 件  旧 ¥{report['old_total'].sum():,} → 新 ¥{report['new_total'].sum():,}"
+              f"  (増減 ¥{report['change'].sum():+,} / 計算できない行 {report['unpriced_lines'].sum()})")
+        if args.out:
+            stem, ext = os.path.splitext(args.out)
+            path = args.out if len(results) == 1 else f"{stem}_{n + 1}{ext or '.csv'}"
+            report.rename(columns=dict(zip(REPORT_COLUMNS, REPORT_HEADERS))).to_csv(path, index=False, encoding="utf-8-sig")
+            print(f"  -> {path}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+
+import streamlit as st
+
+from pricing import DiffTable
+from price_master import PriceMaster
+from estimate_db import EstimateDB
+from item_images import build_thumbnail
+
+# ==========================================
+# プロセス共有のリソース（全ページ・全セッション共通）
+# ==========================================
+# 見積DB・価格マスタ・差額表・部材画像はプロセスで1つだけ作り、どのページからも同じものを使う。
+# ページごとに st.cache_resource を書くとページの数だけ作られるので、読込関数はここにまとめる。
+@st.cache_resource
+def load_estimate_db():
+    return EstimateDB()
+
+# 価格マスタ (masters/price_master.csv) は更新されたら自動で読み直す。
+# 全組み合わせ差額表はマスタが変わったときだけ作り直す。
+@st.cache_resource
+def load_price_master():
+    return PriceMaster()
+
+@st.cache_resource(max_entries=2)
+def load_diff_table(fingerprint, _tables):
+    return DiffTable(_tables)
+
+def load_master():
+    """(PriceMaster, PriceTables, DiffTable)。"""
+    price_master = load_price_master()
+    tables = price_master.get()
+    return price_master, tables, load_diff_table(tables.fingerprint, tables)
+
+def warn_master_error(price_master):
+    """編集したカタログに問題があれば、前回読めたマスタで計算していることを画面に出す。"""
+    if price_master.error:
+        st.warning(f"価格マスタ ({os.path.basename(price_master.catalog_path)}) に問題があるため、前回読み込めた内容で計算しています。"
+                   f"ファイルを直すと自動で反映されます。  \n" + price_master.error.replace("\n", "  \n"))
+
+# 部材画像は最初に表示するときに1回だけ縮小・圧縮する（起動時に全部材を読まない）
+@st.cache_resource(max_entries=1024)
+def load_thumbnail(fingerprint, item_key, _item):
+    return build_thumbnail(_item)
@@ -0,0 +1,220 @@
+import argparse
+import csv
+import glob
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pricing import COLOR_TYPES, HANDLE_TYPES, DiffTable, gang_spec, unit_spec
+from estimate_store import COLUMNS
+from gang_catalog import config_detail
+
+# ==========================================
+# 1. 拾い表の形式
+# ==========================================
+# 1行 = 1プレート。
+#   room   : 部屋名・棟名など (任意、詳細欄の先頭に付く)
+#   item   : 1連の部材キー (layout が空のとき必須)
+#   layout : 多連の割り付け。列を "/" で区切り、各列を "handle:部材+部材" で書く
+#            例) "single:sw_b_mech / double:sw_h_mech+sw_3_mech"
+#   name   : ネーム付 (1/0, true/false)
+#   qty    : 数量 (1〜MAX_QTY の整数)
+#   src, tgt, color : 変更元/変更先/色 (任意、空なら画面・引数の設定を使う)
+TAKEOFF_COLUMNS = ["room", "item", "layout", "name", "qty", "src", "tgt", "color"]
+TAKEOFF_EXTENSIONS = (".csv", ".xlsx", ".xlsm")
+MAX_QTY = 1_000_000  # 見積ストアの数量は int32。桁の打ち間違いで金額があふれないよう上限を設ける
+_TRUE = {"true", "1", "yes", "y", "○"}
+_FALSE = {"false", "0", "no", "n", "", "×"}
+TEMPLATE_ROWS = [
+    {"room": "LDK", "item": "sw_b_mech", "layout": "", "name": 0, "qty": 4},
+    {"room": "LDK", "item": "outlet_w", "layout": "", "name": 0, "qty": 6},
+    {"room": "玄関", "item": "", "layout": "single:sw_h_mech / double:sw_3_mech+sw_b_mech", "name": 1, "qty": 1},
+]
+
+# pandas は表を読む・計算するときだけ読み込む（画面の初回表示では使わない）
+def template_csv():
+    """ひな形の CSV (BOM 付き UTF-8)。画面の初回表示で使うので pandas なしで作る。"""
+    out = io.StringIO()
+    writer = csv.DictWriter(out, TAKEOFF_COLUMNS, lineterminator="\n")
+    writer.writeheader(); writer.writerows(TEMPLATE_ROWS)
+    return out.getvalue().encode("utf-8_sig")
+
+def read_takeoff(source, filename=None):
+    import pandas as pd
+    filename = filename or str(source)
+    try:
+        if filename.lower().endswith((".xlsx", ".xlsm")):
+            df = pd.read_excel(source, dtype=str, keep_default_na=False, engine="openpyxl")
+        else:
+            df = pd.read_csv(source, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    except ValueError:
+        raise
+    except Exception as e:  # 拡張子だけ xlsx の壊れたファイルなど (zipfile.BadZipFile 等)
+        raise ValueError(f"拾い表を読み込めませんでした ({type(e).__name__}: {e})") from e
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    for c in TAKEOFF_COLUMNS:
+        if c not in df.columns: df[c] = ""
+    return df[TAKEOFF_COLUMNS].astype(str).apply(lambda col: col.str.strip())
+
+def parse_layout(text, is_name=False):
+    """"single:a / double:b+c" を column_configs 形式に変換する。"""
+    configs = []
+    for token in text.split("/"):
+        handle, sep, items = token.strip().partition(":")
+        handle = handle.strip()
+        if not sep or handle not in HANDLE_TYPES:
+            raise ValueError(f"割り付けの書式が不正です ({token.strip()})")
+        configs.append({"items": [i.strip() for i in items.split("+") if i.strip()], "handle": handle, "is_name": is_name})
+    if not 1 <= len(configs) <= 3: raise ValueError(f"多連は1〜3列までです ({text})")
+    return configs
+
+# ==========================================
+# 2. 検証と一括計算
+# ==========================================
+def validate_takeoff(df, tables, src, tgt, color="std"):
+    """型をそろえ、空欄を既定値で埋める。問題があればまとめて ValueError にする。"""
+    import pandas as pd
+    errors = []
+    out = df.copy()
+    for c, default in (("src", src), ("tgt", tgt), ("color", color)):
+        out[c] = out[c].where(out[c] != "", default)
+    flags = out["name"].str.lower()
+    bad = ~flags.isin(_TRUE | _FALSE)
+    for i in out.index[bad]: errors.append(f"{i + 2}行目: name は 1/0 で指定してください ({out.at[i, 'name']})")
+    out["name"] = flags.isin(_TRUE)
+    qty = pd.to_numeric(out["qty"], errors="coerce")
+    bad = qty.isna() | ~np.isfinite(qty) | (qty < 1) | (qty > MAX_QTY) | (qty != qty.round())
+    for i in out.index[bad]: errors.append(f"{i + 2}行目: qty は1〜{MAX_QTY:,}の整数で指定してください ({out.at[i, 'qty']})")
+    out["qty"] = qty.where(~bad, 0).astype(np.int64)
+    for c, keys in (("src", tables.series_keys), ("tgt", tables.series_keys), ("color", COLOR_TYPES)):
+        for i in out.index[~out[c].isin(keys)]: errors.append(f"{i + 2}行目: {c} が未登録です ({out.at[i, c]})")
+    is_unit = out["layout"] == ""
+    for i in out.index[is_unit & ~out["item"].isin(tables.item_keys)]:
+        errors.append(f"{i + 2}行目: item が未登録です ({out.at[i, 'item']})")
+    out["spec"] = ""
+    for i in out.index[~is_unit]:
+        try:
+            configs = parse_layout(out.at[i, "layout"], bool(out.at[i, "name"]))
+            unknown = [itm for c in configs for itm in c["items"] if itm not in tables.items]
+            counts_ok = all(len(c["items"]) == HANDLE_TYPES.index(c["handle"]) + 1 for c in configs)
+            if unknown: raise ValueError(f"未登録の部材です {unknown}")
+            if not counts_ok: raise ValueError("single/double/triple と部材数が合いません")
+            out.at[i, "spec"] = gang_spec(configs)
+        except ValueError as e:
+            errors.append(f"{i + 2}行目: {e}")
+    if errors: raise ValueError("拾い表に問題があります:\n" + "\n".join(errors))
+    return out
+
+def price_takeoff(df, diff_table, src, tgt, color="std"):
+    """拾い表をまとめて計算し、見積ストアにそのまま extend できる DataFrame を返す。"""
+    import pandas as pd
+    t = diff_table.tables
+    df = validate_takeoff(df, t, src, tgt, color).reset_index(drop=True)
+    n = len(df)
+    unit_diff = np.zeros(n, dtype=np.float64)
+    row_type = np.full(n, "1連(基本)", dtype=object)
+    name = np.full(n, "詳細構成セット", dtype=object)
+    detail = np.empty(n, dtype=object)
+
+    # 1連: 差額表をまとめて引く
+    is_unit = (df["layout"] == "").to_numpy()
+    if is_unit.any():
+        u = df[is_unit]
+        window = t.has_lamp[[t.item_index[k] for k in u["item"]]]
+        priced = t.price_batch(pd.DataFrame({"item": u["item"], "src": u["src"], "tgt": u["tgt"], "color": u["color"],
+                                             "window": window, "name": u["name"], "handle": "single", "qty": u["qty"]}))
+        unit_diff[is_unit] = priced["unit_diff"].to_numpy()
+        name[is_unit] = [t.items[k]["name"] for k in u["item"]]
+        detail[is_unit] = ["標準セット" + ("(表示付)" if w else "") + ("(ネーム付)" if nm else "") for w, nm in zip(window, u["name"])]
+        df.loc[is_unit, "spec"] = [unit_spec(k, w, nm) for k, w, nm in zip(u["item"], window, u["name"])]
+
+    # 多連: 同じ構成・シリーズの組はまとめて1回だけ計算する
+    if (~is_unit).any():
+        g = df[~is_unit]
+        memo = {key: diff_table.spec_diff(*key) for key in set(zip(g["spec"], g["src"], g["tgt"], g["color"]))}
+        unit_diff[~is_unit] = [memo[key] for key in zip(g["spec"], g["src"], g["tgt"], g["color"])]
+        cols_num = [len(s.split("/")) for s in g["layout"]]
+        row_type[~is_unit] = [f"{c}連カスタム" for c in cols_num]
+        detail[~is_unit] = [config_detail(parse_layout(layout), t.items) for layout in g["layout"]]
+
+    room = df["room"].to_numpy(dtype=object)
+    detail = np.where(room != "", "[" + room + "] " + detail, detail)
+    unit_diff = np.rint(unit_diff).astype(np.int64)
+    qty = df["qty"].to_numpy(dtype=np.int64)
+    return pd.DataFrame({"type": row_type, "name": name, "detail": detail, "unit_diff": unit_diff, "qty": qty,
+                         "total_diff": unit_diff * qty, "src": df["src"], "tgt": df["tgt"], "color": df["color"],
+                         "spec": df["spec"]}, columns=COLUMNS)
+
+# ==========================================
+# 3. コマンドライン（フォルダ一括処理）
+# ==========================================
+_WORKER = {}
+
+def _init_worker(catalog_path):
+    from price_master import load_catalog_tables
+    _WORKER["diff_table"] = DiffTable(load_catalog_tables(catalog_path))
+
+def _process_file(path, out_dir, src, tgt, color):
+    from export import to_excel
+    diff_table = _WORKER["diff_table"]
+    # 1ファイルの失敗 (壊れた xlsx・書き込めない出力先など) で夜間の一括処理全体を止めない
+    try:
+        priced = price_takeoff(read_takeoff(path), diff_table, src, tgt, color)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        out_path = os.path.join(out_dir, f"{stem}_見積.xlsx")
+        names = diff_table.tables.series_names
+        total = int(priced["total_diff"].sum())
+        with open(out_path, "wb") as f:
+            f.write(to_excel(priced, stem, "", names[src], names[tgt], total))
+    except ValueError as e:
+        return path, None, str(e)
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+    return path, out_path, total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="拾い表 (CSV/Excel) を一括で差額見積りし、xlsx を書き出す")
+    parser.add_argument("inputs", nargs="+", help="拾い表ファイル、またはそれを含むフォルダ")
+    parser.add_argument("--src", default="cosmo", help="変更元シリーズ (既定: cosmo)")
+    parser.add_argument("--tgt", default="advance", help="変更先シリーズ (既定: advance)")
+    parser.add_argument("--color", default="std", choices=COLOR_TYPES)
+    parser.add_argument("--out", default=None, help="出力フォルダ (既定: 入力と同じ場所)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="並列プロセス数")
+    parser.add_argument("--catalog", default=None, help="価格マスタ (既定: masters/price_master.csv)")
+    args = parser.parse_args(argv)
+
+    files = []
+    for p in args.inputs:
+        if os.path.isdir(p):
+            files += sorted(f for f in glob.glob(os.path.join(p, "*")) if f.lower().endswith(TAKEOFF_EXTENSIONS)
+                            and not os.path.basename(f).startswith("~$"))
+        else:
+            files.append(p)
+    if not files:
+        print("拾い表が見つかりません", file=sys.stderr); return 1
+
+    # 価格マスタが読めないまま組み込みマスタで全件を計算しないよう、ファイルを流す前に確かめる
+    from price_master import load_catalog_tables
+    try:
+        load_catalog_tables(args.catalog)
+    except (ValueError, OSError) as e:
+        print(f"価格マスタを読み込めません: {args.catalog or '既定のマスタ'}\n{e}", file=sys.stderr); return 1
+
+    if args.out: os.makedirs(args.out, exist_ok=True)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.catalog,)) as pool:
+        futures = [pool.submit(_process_file, f, args.out or os.path.dirname(os.path.abspath(f)), args.src, args.tgt, args.color)
+                   for f in files]
+        for fut in futures:
+            path, out_path, result = fut.result()
+            if out_path is None:
+                failed += 1; print(f"NG {path}\n{result}", file=sys.stderr)
+            else:
+                print(f"OK {path} -> {out_path} (¥{result:,})")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())